@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.conf import settings
+        from django.template.loader import get_template
+
+        for template_name in settings.TEMPLATE_WARMUP:
+            get_template(template_name)
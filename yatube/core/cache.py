@@ -0,0 +1,156 @@
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .metrics import record_cache
+
+MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    """Кэш из двух уровней: небольшой LRU в памяти процесса перед общим
+    для всех воркеров кэшем (алиас из settings.CACHES).
+
+    Локальный уровень хранит значения не дольше LOCAL_TIMEOUT секунд.
+    set() и delete() обновляют его только в своём процессе: другие
+    воркеры до LOCAL_TIMEOUT секунд отдают прежнее значение ключа.
+    Поэтому через этот кэш можно хранить только неизменяемые значения
+    (версионированные ключи: страницы лент, фрагменты постов) и ключи
+    с префиксами из LOCAL_BYPASS_PREFIXES — они всегда читаются из
+    общего уровня (штампы версий лент). По свежему штампу процесс
+    никогда не отдаст устаревшую страницу из локального уровня.
+    Изменяемое значение под постоянным ключом нужно либо добавить в
+    LOCAL_BYPASS_PREFIXES, либо читать через caches['shared'].
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._bypass_prefixes = tuple(
+            options.get('LOCAL_BYPASS_PREFIXES', ())
+        )
+        self._local = LocMemCache(location or 'two-tier', {
+            'TIMEOUT': self._local_timeout,
+            'OPTIONS': {
+                'MAX_ENTRIES': options.get('LOCAL_MAX_ENTRIES', 1000),
+            },
+        })
+
+    @property
+    def _shared(self):
+        return caches[self._shared_alias]
+
+    def _is_local(self, key):
+        return not key.startswith(self._bypass_prefixes)
+
+    def _get_local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self._local_timeout
+        return min(timeout, self._local_timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._shared.add(key, value, timeout, version)
+        if added and self._is_local(key):
+            self._local.set(
+                key, value, self._get_local_timeout(timeout), version
+            )
+        return added
+
+    def get(self, key, default=None, version=None):
+        if self._is_local(key):
+            value = self._local.get(key, MISSING, version)
+            if value is not MISSING:
+                record_cache('local')
+                return value
+        value = self._shared.get(key, MISSING, version)
+        if value is MISSING:
+            record_cache('miss')
+            return default
+        record_cache('shared')
+        if self._is_local(key):
+            self._local.set(key, value, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        local_keys = [key for key in keys if self._is_local(key)]
+        found = self._local.get_many(local_keys, version)
+        record_cache('local', len(found))
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = self._shared.get_many(missing, version)
+            record_cache('shared', len(shared))
+            record_cache('miss', len(missing) - len(shared))
+            self._local.set_many(
+                {key: value for key, value in shared.items()
+                 if self._is_local(key)},
+                version=version
+            )
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._shared.set(key, value, timeout, version)
+        if self._is_local(key):
+            self._local.set(
+                key, value, self._get_local_timeout(timeout), version
+            )
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self._shared.set_many(data, timeout, version)
+        self._local.set_many(
+            {key: value for key, value in data.items()
+             if self._is_local(key) and key not in failed},
+            self._get_local_timeout(timeout),
+            version
+        )
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._local.delete(key, version)
+        return self._shared.touch(key, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        self._local.delete(key, version)
+        return self._shared.incr(key, delta, version)
+
+    def delete(self, key, version=None):
+        self._local.delete(key, version)
+        self._shared.delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        self._local.delete_many(keys, version)
+        self._shared.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        if self._is_local(key) and self._local.has_key(key, version):
+            return True
+        return self._shared.has_key(key, version)
+
+    def clear(self):
+        self._local.clear()
+        self._shared.clear()
+
+    def close(self, **kwargs):
+        self._shared.close(**kwargs)
+
+
+class FileCache(FileBasedCache):
+    """FileBasedCache, который проверяет размер каталога не на каждой
+    записи, а раз в CULL_EVERY записей процесса. Стандартный _cull()
+    перечисляет весь каталог при каждом set(), и запись страницы ленты
+    стоит O(числа записей). Число записей может превысить MAX_ENTRIES
+    не больше чем на CULL_EVERY на процесс."""
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        options = params.get('OPTIONS', {})
+        self._cull_every = max(int(options.get('CULL_EVERY', 1000)), 1)
+        self._writes = 0
+
+    def _cull(self):
+        self._writes += 1
+        if self._writes % self._cull_every == 0:
+            super()._cull()
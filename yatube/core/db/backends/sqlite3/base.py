@@ -0,0 +1,28 @@
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite с настройками для конкурентной нагрузки.
+
+    WAL позволяет читателям не ждать писателя, synchronous=NORMAL
+    в режиме WAL не теряет целостность и убирает fsync на каждой
+    транзакции, busy_timeout заставляет ждать блокировку вместо
+    немедленной ошибки «database is locked». Значения можно
+    переопределить ключом PRAGMAS в настройках базы.
+    """
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = {**PRAGMAS, **self.settings_dict.get('PRAGMAS', {})}
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
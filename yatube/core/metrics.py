@@ -0,0 +1,188 @@
+"""Метрики запросов в памяти процесса в текстовом формате Prometheus.
+
+Каждый воркер считает свои метрики; Prometheus собирает их с каждого
+воркера отдельно и суммирует сам.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Число запросов по представлениям.'
+    ),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время обработки запроса.'
+    ),
+    'yatube_sql_queries_total': (
+        'counter', 'Число SQL-запросов.'
+    ),
+    'yatube_sql_duration_seconds_total': (
+        'counter', 'Суммарное время SQL-запросов.'
+    ),
+    'yatube_template_render_seconds_total': (
+        'counter', 'Суммарное время рендеринга шаблонов.'
+    ),
+    'yatube_cache_requests_total': (
+        'counter', 'Чтения кэша по результату: local, shared или miss.'
+    ),
+    'yatube_response_bytes_total': (
+        'counter', 'Суммарный размер ответов.'
+    ),
+}
+
+logger = logging.getLogger(__name__)
+_current = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """Затраты одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.template_time = 0.0
+        self.cache = defaultdict(int)
+
+    @property
+    def sql_time(self):
+        return sum(duration for sql, duration in self.queries)
+
+    @property
+    def duration(self):
+        return time.perf_counter() - self.started
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = defaultdict(float)
+        self._gauges = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] += value
+
+    def observe(self, name, value, **labels):
+        for bucket in DURATION_BUCKETS:
+            if value <= bucket:
+                self.inc(f'{name}_bucket', le=str(bucket), **labels)
+        self.inc(f'{name}_bucket', le='+Inf', **labels)
+        self.inc(f'{name}_sum', value, **labels)
+        self.inc(f'{name}_count', **labels)
+
+    def register_gauge(self, name, help_text, function, kind='gauge'):
+        """Значение, которое вычисляется в момент выгрузки метрик."""
+        self._gauges[name] = (kind, help_text, function)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def _format(name, labels, value):
+        if labels:
+            name += '{%s}' % ','.join(
+                f'{key}="{label}"' for key, label in labels
+            )
+        return f'{name} {value:g}'
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = []
+        for metric, (kind, help_text) in METRICS.items():
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} {kind}')
+            lines.extend(
+                self._format(name, labels, value)
+                for (name, labels), value in values
+                if name == metric or name.startswith(f'{metric}_')
+            )
+        for name, (kind, help_text, function) in self._gauges.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(self._format(name, (), function()))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def record_query(sql, duration):
+    stats = _current.get()
+    if stats is not None:
+        stats.queries.append((sql, duration))
+
+
+def record_template(duration):
+    stats = _current.get()
+    if stats is not None:
+        stats.template_time += duration
+
+
+def record_cache(result, count=1):
+    """result — local (попадание в память процесса), shared (в общий
+    кэш) или miss."""
+    stats = _current.get()
+    if stats is not None:
+        stats.cache[result] += count
+
+
+def query_recorder(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrapper: время каждого запроса."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record_query(sql, time.perf_counter() - started)
+
+
+def collect(stats, view, response_size):
+    registry.inc('yatube_requests_total', view=view)
+    registry.observe(
+        'yatube_request_duration_seconds', stats.duration, view=view
+    )
+    registry.inc('yatube_sql_queries_total', len(stats.queries), view=view)
+    registry.inc('yatube_sql_duration_seconds_total', stats.sql_time,
+                 view=view)
+    registry.inc('yatube_template_render_seconds_total',
+                 stats.template_time, view=view)
+    for result, count in stats.cache.items():
+        registry.inc('yatube_cache_requests_total', count, view=view,
+                     result=result)
+    if response_size is not None:
+        registry.inc('yatube_response_bytes_total', response_size,
+                     view=view)
+
+
+def log_slow_request(stats, view, request, top=5):
+    queries = sorted(stats.queries, key=lambda query: -query[1])[:top]
+    logger.warning(
+        'Медленный запрос %s %s (%s): %.3f с, SQL %d запросов за %.3f с, '
+        'шаблоны %.3f с\n%s',
+        request.method,
+        request.get_full_path(),
+        view,
+        stats.duration,
+        len(stats.queries),
+        stats.sql_time,
+        stats.template_time,
+        '\n'.join(
+            f'  {duration * 1000:.1f} мс: {sql[:300]}'
+            for sql, duration in queries
+        )
+    )
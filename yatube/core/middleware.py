@@ -0,0 +1,154 @@
+import mimetypes
+import os
+import re
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connections
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from . import metrics
+from .routers import STICKY_COOKIE, finish_tracking, track_writes
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+# Имя с хэшем содержимого от ManifestStaticFilesStorage: style.1a2b3c4d5e6f.css
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+STATIC_IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+STATIC_CACHE = 'public, max-age=60'
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+class ReplicaStickyMiddleware:
+    """После запроса с записью в базу ставит cookie, по которой
+    REPLICA_STICKY_SECONDS секунд чтения пользователя идут на основную
+    базу: реплика может отставать, а автор должен сразу видеть
+    свой пост, комментарий или подписку."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = track_writes()
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = finish_tracking(token)
+        if wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                STICKY_COOKIE,
+                '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """Считает затраты запроса: SQL-запросы и их время, рендеринг
+    шаблонов, чтения кэша и размер ответа. Результат попадает
+    в core.metrics.registry, медленные запросы пишутся в лог вместе
+    с самыми долгими SQL-запросами."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats, token = metrics.start_request()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.query_recorder)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        view = (request.resolver_match.view_name
+                if request.resolver_match else 'unresolved')
+        metrics.collect(
+            stats,
+            view,
+            None if response.streaming else len(response.content)
+        )
+        if stats.duration >= settings.METRICS_SLOW_REQUEST_SECONDS:
+            metrics.log_slow_request(stats, view, request)
+        return response
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме явно запрещённых q=0."""
+    encodings = set()
+    for part in header.split(','):
+        encoding, _, params = part.partition(';')
+        quality = params.replace(' ', '').lower()
+        if quality.startswith('q=') and not quality[2:].strip('0.'):
+            continue
+        encodings.add(encoding.strip().lower())
+    return encodings
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную collectstatic статику из STATIC_ROOT прямо из
+    процесса Django — для развёртывания на одной машине без nginx.
+
+    Файлы с хэшем в имени кэшируются клиентами на год (immutable):
+    при изменении содержимого меняется и имя. Если клиент принимает
+    br или gzip, отдаётся заранее сжатая копия (см. core.storage).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = settings.STATIC_ROOT
+
+    def __call__(self, request):
+        if (request.method in ('GET', 'HEAD')
+                and request.path.startswith(self.prefix)):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        if not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat.st_mtime,
+            stat.st_size
+        ):
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(path)
+            encodings = accepted_encodings(
+                request.META.get('HTTP_ACCEPT_ENCODING', '')
+            )
+            served, content_encoding = path, None
+            for encoding, extension in PRECOMPRESSED:
+                if (encoding in encodings
+                        and os.path.isfile(path + extension)):
+                    served, content_encoding = path + extension, encoding
+                    break
+            response = FileResponse(
+                open(served, 'rb'),
+                content_type=content_type or 'application/octet-stream'
+            )
+            if content_encoding:
+                response['Content-Encoding'] = content_encoding
+            response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = (
+            STATIC_IMMUTABLE_CACHE if HASHED_NAME.search(name)
+            else STATIC_CACHE
+        )
+        return response
@@ -0,0 +1,79 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+STICKY_COOKIE = 'primary_db'
+
+_use_replica = ContextVar('use_replica', default=False)
+_wrote = ContextVar('wrote', default=False)
+
+
+@contextmanager
+def use_replica():
+    """Чтения внутри блока идут на реплики из REPLICA_DATABASES."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Чтения внутри блока идут на основную базу, даже если блок
+    вложен в use_replica."""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def read_replica(view):
+    """Отправляет чтения представления на реплику, если только
+    пользователь недавно не писал в базу (см. ReplicaStickyMiddleware):
+    тогда он читает с основной базы и видит свои изменения."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if STICKY_COOKIE in request.COOKIES:
+            return view(request, *args, **kwargs)
+        with use_replica():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def track_writes():
+    """Начинает отслеживать записи в базу; возвращает токен для
+    finish_tracking."""
+    return _wrote.set(False)
+
+
+def finish_tracking(token):
+    """Были ли записи в базу с момента track_writes."""
+    wrote = _wrote.get()
+    _wrote.reset(token)
+    return wrote
+
+
+class ReplicaRouter:
+    """Записи и миграции — в default, чтения в блоках use_replica —
+    на случайную реплику из settings.REPLICA_DATABASES."""
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'REPLICA_DATABASES', ())
+        if replicas and _use_replica.get():
+            return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,72 @@
+"""Хранилище статики для продакшена: имена с хэшем содержимого
+(ManifestStaticFilesStorage) и сжатые копии рядом с файлами.
+
+Сжатые копии (.gz и, если установлен пакет brotli, .br) создаются один
+раз при collectstatic; веб-сервер (nginx с gzip_static/brotli_static
+или core.middleware.StaticFilesMiddleware) отдаёт их без сжатия на лету.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.svg', '.txt', '.html', '.json', '.xml', '.map', '.ico',
+)
+COMPRESS_MIN_SIZE = 256
+# Сжатая копия сохраняется, только если она меньше этой доли оригинала.
+COMPRESS_MAX_RATIO = 0.95
+
+
+def gzip_compress(content):
+    # mtime=0: одинаковый результат при каждом collectstatic.
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def brotli_compress(content):
+    return brotli.compress(content, quality=11)
+
+
+def get_encoders():
+    """Доступные способы сжатия: расширение -> функция."""
+    encoders = {'.gz': gzip_compress}
+    if brotli is not None:
+        encoders['.br'] = brotli_compress
+    return encoders
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(self.hashed_files.values()) | set(paths)
+        for name in sorted(names):
+            for compressed in self.compress(name):
+                yield name, compressed, True
+
+    def compress(self, name):
+        """Создаёт сжатые копии файла; возвращает их имена."""
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return []
+        path = self.path(name)
+        if not os.path.exists(path):
+            return []
+        with open(path, 'rb') as file:
+            content = file.read()
+        if len(content) < COMPRESS_MIN_SIZE:
+            return []
+        created = []
+        for extension, encode in get_encoders().items():
+            compressed = encode(content)
+            if len(compressed) > len(content) * COMPRESS_MAX_RATIO:
+                continue
+            with open(path + extension, 'wb') as file:
+                file.write(compressed)
+            created.append(name + extension)
+        return created
@@ -0,0 +1,85 @@
+"""Загрузчик шаблонов для продакшена.
+
+Шаблоны компилируются один раз на процесс (как у cached.Loader),
+а {% include %} с постоянным именем заменяется при компиляции самим
+включаемым шаблоном. В ленте include поста выполняется для каждого
+поста страницы; после подстановки остаётся только обход уже
+скомпилированных узлов, без поиска шаблона и его render().
+"""
+from django.template import TemplateDoesNotExist
+from django.template.base import Node
+from django.template.defaulttags import IfNode
+from django.template.loader_tags import IncludeNode
+from django.template.loaders.cached import Loader as CachedLoader
+
+
+class InlinedIncludeNode(Node):
+    """Содержимое включённого шаблона на месте {% include %}. Контекст
+    ведёт себя как при include: with-переменные видны только внутри."""
+
+    child_nodelists = ()
+
+    def __init__(self, template, include):
+        self.template = template
+        self.nodelist = template.nodelist
+        self.extra_context = include.extra_context
+        # Для сообщений об ошибках в режиме отладки.
+        self.token = include.token
+        self.origin = include.origin
+
+    def render(self, context):
+        values = {
+            name: value.resolve(context)
+            for name, value in self.extra_context.items()
+        }
+        with context.push(**values):
+            return self.nodelist.render(context)
+
+    def __repr__(self):
+        return f'<InlinedIncludeNode: {self.template.name}>'
+
+
+def _child_nodelists(node):
+    if isinstance(node, IfNode):
+        # IfNode.nodelist собирается заново при каждом обращении.
+        return [nodelist for _, nodelist in node.conditions_nodelists]
+    return [
+        getattr(node, attr) for attr in node.child_nodelists
+        if getattr(node, attr, None) is not None
+    ]
+
+
+def _is_inlinable(node):
+    return (
+        isinstance(node, IncludeNode)
+        and isinstance(node.template.var, str)
+        and not node.template.filters
+        and not node.isolated_context
+    )
+
+
+class Loader(CachedLoader):
+    """cached.Loader с подстановкой include. Опции те же:
+    ('core.template_loaders.Loader', [загрузчики])."""
+
+    def get_template(self, template_name, skip=None):
+        template = super().get_template(template_name, skip)
+        if not getattr(template, 'includes_inlined', False):
+            # Флаг ставится до обхода: шаблоны, включающие друг друга,
+            # не зациклят компиляцию.
+            template.includes_inlined = True
+            self.inline_includes(template.nodelist)
+        return template
+
+    def inline_includes(self, nodelist):
+        for index, node in enumerate(nodelist):
+            if _is_inlinable(node):
+                try:
+                    included = self.engine.get_template(node.template.var)
+                except TemplateDoesNotExist:
+                    # Ошибка останется там же, где была: при рендеринге.
+                    continue
+                nodelist[index] = InlinedIncludeNode(included, node)
+                continue
+            for child in _child_nodelists(node):
+                self.inline_includes(child)
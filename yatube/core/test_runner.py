@@ -0,0 +1,31 @@
+"""Запуск тестов с файловым кэшем во временном каталоге."""
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+from django.utils.module_loading import import_string
+
+
+class TemporaryCacheRunner(DiscoverRunner):
+    """DiscoverRunner, который на время тестов переносит файловые кэши
+    из CACHES во временный каталог: тесты очищают кэш и не должны
+    читать или стирать BASE_DIR/cache работающего сайта."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_dir = tempfile.mkdtemp()
+        caches = {}
+        for alias, options in settings.CACHES.items():
+            if issubclass(import_string(options['BACKEND']), FileBasedCache):
+                options = {**options, 'LOCATION': f'{self._cache_dir}/{alias}'}
+            caches[alias] = options
+        self._cache_settings = override_settings(CACHES=caches)
+        self._cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_settings.disable()
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from ..cache import FileCache, TwoTierCache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'two-tier-tests',
+    },
+}
+OPTIONS = {
+    'SHARED': 'shared',
+    'LOCAL_TIMEOUT': 60,
+    'LOCAL_BYPASS_PREFIXES': ('feed-version:',),
+}
+
+
+@override_settings(CACHES=CACHES)
+class TwoTierCacheTest(SimpleTestCase):
+    """Тестируем двухуровневый кэш."""
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.worker = TwoTierCache('worker', {'OPTIONS': OPTIONS})
+        self.another_worker = TwoTierCache(
+            'another-worker',
+            {'OPTIONS': OPTIONS}
+        )
+        self.worker.clear()
+        self.another_worker.clear()
+
+    def test_values_shared_between_workers(self):
+        """Проверяем, что значение, записанное одним воркером, видно
+        другому через общий уровень."""
+        self.worker.set('key', 'value')
+        self.assertEqual(self.another_worker.get('key'), 'value')
+        self.assertEqual(
+            self.another_worker.get_many(['key', 'missing']),
+            {'key': 'value'}
+        )
+        self.worker.delete('key')
+        self.assertIsNone(caches['shared'].get('key'))
+
+    def test_local_tier_serves_repeated_reads(self):
+        """Проверяем, что повторное чтение не обращается к общему уровню."""
+        self.worker.set('key', 'value')
+        caches['shared'].delete('key')
+        self.assertEqual(self.worker.get('key'), 'value')
+
+    def test_version_stamps_bypass_local_tier(self):
+        """Проверяем, что штампы версий всегда читаются из общего уровня и
+        обновление штампа сразу видно другим воркерам."""
+        self.worker.set('feed-version:index', 'old')
+        self.assertEqual(self.another_worker.get('feed-version:index'), 'old')
+        self.worker.set('feed-version:index', 'new')
+        self.assertEqual(
+            self.another_worker.get_many(['feed-version:index']),
+            {'feed-version:index': 'new'}
+        )
+
+
+class FileCacheTest(SimpleTestCase):
+    """Тестируем файловый кэш с редкой проверкой размера."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = FileCache(self.directory, {
+            'OPTIONS': {'MAX_ENTRIES': 5, 'CULL_EVERY': 10},
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_directory_listed_once_per_cull_every(self):
+        """Проверяем, что каталог перечисляется раз в CULL_EVERY записей,
+        а лишние записи всё равно вытесняются."""
+        with mock.patch.object(
+            self.cache, '_list_cache_files',
+            wraps=self.cache._list_cache_files
+        ) as list_files:
+            for index in range(20):
+                self.cache.set(f'key-{index}', index)
+        self.assertEqual(list_files.call_count, 2)
+        self.assertLess(len(os.listdir(self.directory)), 20)
+
+    def test_tests_do_not_use_project_cache(self):
+        self.assertNotEqual(
+            os.path.abspath(caches['shared']._dir),
+            os.path.join(settings.BASE_DIR, 'cache')
+        )
@@ -0,0 +1,32 @@
+import os
+import tempfile
+
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+
+class SqliteBackendTest(SimpleTestCase):
+    """Тестируем обёртку над SQLite."""
+
+    def test_pragmas_applied(self):
+        """Проверяем, что новое соединение получает PRAGMA по умолчанию
+        и переопределённые в настройках базы."""
+        with tempfile.TemporaryDirectory() as directory:
+            connection = ConnectionHandler({'default': {
+                'ENGINE': 'core.db.backends.sqlite3',
+                'NAME': os.path.join(directory, 'db.sqlite3'),
+                'PRAGMAS': {'busy_timeout': 1000},
+            }})['default']
+            expected = {
+                'journal_mode': 'wal',
+                'synchronous': 1,
+                'busy_timeout': 1000,
+            }
+            try:
+                with connection.cursor() as cursor:
+                    for pragma, value in expected.items():
+                        with self.subTest(pragma=pragma):
+                            cursor.execute(f'PRAGMA {pragma}')
+                            self.assertEqual(cursor.fetchone()[0], value)
+            finally:
+                connection.close()
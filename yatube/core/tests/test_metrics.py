@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..metrics import registry
+
+INDEX_URL = reverse('posts:index')
+METRICS_URL = reverse('metrics')
+
+
+class MetricsTest(TestCase):
+    """Тестируем сбор и выгрузку метрик запросов."""
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.client = Client()
+
+    def test_request_metrics_exported(self):
+        """Проверяем, что запросы к ленте попадают в метрики
+        по имени представления."""
+        self.client.get(INDEX_URL)
+        self.client.get(INDEX_URL)
+        content = self.client.get(METRICS_URL).content.decode()
+        expected = (
+            'yatube_requests_total{view="posts:index"} 2',
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            'yatube_sql_queries_total{view="posts:index"}',
+            'yatube_template_render_seconds_total{view="posts:index"}',
+            'yatube_cache_requests_total{result="shared",view="posts:index"}',
+            'yatube_response_bytes_total{view="posts:index"}',
+            'yatube_thumbnail_queue_depth 0',
+        )
+        for line in expected:
+            with self.subTest(line=line):
+                self.assertIn(line, content)
+
+    def test_metrics_are_internal(self):
+        """Проверяем, что метрики не отдаются внешним адресам."""
+        response = self.client.get(METRICS_URL, REMOTE_ADDR='10.0.0.1')
+        self.assertTemplateUsed(response, 'core/403.html')
+
+    @override_settings(METRICS_SLOW_REQUEST_SECONDS=0)
+    def test_slow_requests_logged(self):
+        """Проверяем, что медленный запрос пишется в лог с SQL."""
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            self.client.get(INDEX_URL)
+        self.assertIn('posts:index', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..middleware import ReplicaStickyMiddleware
+from ..routers import STICKY_COOKIE, read_replica
+
+User = get_user_model()
+
+
+@read_replica
+def read_view(request):
+    return HttpResponse(router.db_for_read(User))
+
+
+def write_view(request):
+    return HttpResponse(router.db_for_write(User))
+
+
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_STICKY_SECONDS=10)
+class ReplicaRouterTest(SimpleTestCase):
+    """Тестируем маршрутизацию чтений на реплики."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_read_views_use_replica(self):
+        """Проверяем, что на реплику идут только чтения помеченных
+        представлений, а записи и остальные чтения — в default."""
+        request = self.factory.get('/')
+        self.assertEqual(read_view(request).content, b'replica')
+        self.assertEqual(router.db_for_read(User), 'default')
+        self.assertEqual(write_view(request).content, b'default')
+
+    def test_sticky_after_write(self):
+        """Проверяем, что после записи ставится cookie, с которой
+        пользователь читает с основной базы."""
+        cases = (
+            (write_view, 'get', True),
+            (read_view, 'post', True),
+            (read_view, 'get', False),
+        )
+        for view, method, sticky in cases:
+            with self.subTest(view=view, method=method):
+                response = ReplicaStickyMiddleware(view)(
+                    getattr(self.factory, method)('/')
+                )
+                self.assertEqual(STICKY_COOKIE in response.cookies, sticky)
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = '1'
+        self.assertEqual(read_view(request).content, b'default')
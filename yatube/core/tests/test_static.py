@@ -0,0 +1,93 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.http import http_date
+
+from ..middleware import StaticFilesMiddleware, accepted_encodings
+
+STATIC_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    STATIC_ROOT=STATIC_ROOT,
+    STATICFILES_STORAGE='core.storage.CompressedManifestStaticFilesStorage',
+)
+class StaticPipelineTest(SimpleTestCase):
+    """Тестируем сборку статики и её раздачу из процесса."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.hashed = staticfiles_storage.stored_name('css/bootstrap.min.css')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.middleware = StaticFilesMiddleware(
+            lambda request: HttpResponse('приложение')
+        )
+
+    def get(self, path, **headers):
+        return self.middleware(RequestFactory().get(path, **headers))
+
+    def test_collectstatic_precompresses(self):
+        """Проверяем, что рядом с файлом с хэшем лежит его gzip-копия."""
+        self.assertNotEqual(self.hashed, 'css/bootstrap.min.css')
+        path = staticfiles_storage.path(self.hashed)
+        with open(path, 'rb') as original, \
+                gzip.open(path + '.gz', 'rb') as compressed:
+            self.assertEqual(compressed.read(), original.read())
+        self.assertFalse(os.path.exists(
+            staticfiles_storage.path(
+                staticfiles_storage.stored_name('img/logo.png')
+            ) + '.gz'
+        ))
+
+    def test_serves_compressed_with_far_future_headers(self):
+        """Проверяем, что файл с хэшем отдаётся сжатым и кэшируется
+        на год, а файл без хэша — ненадолго."""
+        response = self.get(f'/static/{self.hashed}',
+                            HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        with open(staticfiles_storage.path(self.hashed), 'rb') as file:
+            self.assertEqual(
+                gzip.decompress(b''.join(response.streaming_content)),
+                file.read()
+            )
+        response = self.get('/static/css/bootstrap.min.css',
+                            HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+
+    def test_not_modified(self):
+        mtime = os.stat(staticfiles_storage.path(self.hashed)).st_mtime
+        response = self.get(f'/static/{self.hashed}',
+                            HTTP_IF_MODIFIED_SINCE=http_date(mtime))
+        self.assertEqual(response.status_code, 304)
+
+    def test_other_requests_pass_through(self):
+        """Проверяем, что запросы вне статики, к несуществующим файлам
+        и с выходом за STATIC_ROOT обрабатывает приложение."""
+        for path in ('/', '/static/missing.css', '/static/../etc/passwd'):
+            with self.subTest(path=path):
+                response = self.get(path)
+                self.assertEqual(response.content.decode(), 'приложение')
+
+    def test_accepted_encodings(self):
+        self.assertEqual(
+            accepted_encodings('gzip;q=0.5, br;q=0, identity'),
+            {'gzip', 'identity'}
+        )
@@ -0,0 +1,71 @@
+from django.template import Context, Engine, TemplateDoesNotExist
+from django.test import SimpleTestCase
+
+from ..template_loaders import InlinedIncludeNode
+
+TEMPLATES = {
+    'feed.html': (
+        '{% for item in items %}'
+        '{% include "item.html" with prefix="#" %}'
+        '{% endfor %}{{ prefix|default:"-" }}'
+    ),
+    'item.html': '{% if item %}{{ prefix }}{{ item }};{% endif %}',
+    'dynamic.html': '{% include name %}',
+    'missing.html': '{% include "nope.html" %}',
+    'tree.html': (
+        '[{{ node.name }}{% for node in node.children %}'
+        '{% include "tree.html" %}{% endfor %}]'
+    ),
+}
+
+
+def make_engine(loader):
+    return Engine(loaders=[
+        (loader, [('django.template.loaders.locmem.Loader', TEMPLATES)])
+    ])
+
+
+class InliningLoaderTest(SimpleTestCase):
+    """Тестируем подстановку include при компиляции шаблонов."""
+
+    def setUp(self):
+        self.engine = make_engine('core.template_loaders.Loader')
+        self.reference = make_engine('django.template.loaders.cached.Loader')
+
+    def render(self, engine, template_name, **context):
+        return engine.get_template(template_name).render(Context(context))
+
+    def test_same_output(self):
+        """Проверяем, что результат совпадает с обычным include, а
+        with-переменные не выходят за пределы включённого шаблона."""
+        cases = (
+            ('feed.html', {'items': [1, 0, 2]}),
+            ('dynamic.html', {'name': 'item.html', 'item': 3}),
+            ('tree.html', {'node': {'name': 'a', 'children': [
+                {'name': 'b', 'children': [{'name': 'c', 'children': []}]},
+            ]}}),
+        )
+        for template_name, context in cases:
+            with self.subTest(template_name=template_name):
+                self.assertEqual(
+                    self.render(self.engine, template_name, **context),
+                    self.render(self.reference, template_name, **context)
+                )
+        self.assertEqual(
+            self.render(self.engine, 'feed.html', items=[1, 2]), '#1;#2;-'
+        )
+
+    def test_constant_includes_inlined(self):
+        """Проверяем, что include с постоянным именем заменён, а с
+        переменным — оставлен как есть."""
+        feed = self.engine.get_template('feed.html')
+        self.assertIsInstance(
+            feed.nodelist[0].nodelist_loop[0], InlinedIncludeNode
+        )
+        dynamic = self.engine.get_template('dynamic.html')
+        self.assertNotIsInstance(dynamic.nodelist[0], InlinedIncludeNode)
+
+    def test_missing_include_fails_on_render(self):
+        template = self.engine.get_template('missing.html')
+        with self.assertRaises(TemplateDoesNotExist):
+            template.render(Context())
@@ -1,5 +1,10 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from .metrics import registry
+
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html')
@@ -20,3 +25,16 @@ def page_not_found(request, exception):
 
 def server_error(request):
     return render(request, 'core/500.html')
+
+
+def metrics(request):
+    """Метрики процесса для Prometheus. Доступны с адресов из
+    METRICS_ALLOWED_IPS и сотрудникам; снаружи путь /internal/ должен
+    закрываться и на прокси."""
+    if not (request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+            or request.user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
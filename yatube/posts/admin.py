@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Comment, Follow, Group, Post
+from .search import search_posts
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -15,6 +16,11 @@ class PostAdmin(admin.ModelAdmin):
     list_editable = ('group',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return queryset.filter(pk__in=search_posts(search_term)), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
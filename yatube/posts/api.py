@@ -0,0 +1,232 @@
+"""JSON API v1 только для чтения: посты, группы, профили, комментарии
+и лента подписок.
+
+Ответы собираются из values_list: связанные объекты приходят тем же
+запросом через JOIN, экземпляры моделей не создаются. Списки
+постраничные по курсору (?cursor=, ?limit=), состав полей задаётся
+параметром ?fields=id,text,...
+"""
+from functools import wraps
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from core.routers import read_replica
+
+from .models import Comment, Group, Post, User
+from .paginators import CursorPaginator
+from .settings import API_MAX_PAGE_SIZE, API_PAGE_SIZE
+from .timeline import get_follow_feed
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _media_url(name):
+    return default_storage.url(name) if name else None
+
+
+class Resource:
+    """Описание выдачи: имя поля в ответе -> колонка для values_list
+    (через __ — поле связанной модели) и преобразования значений."""
+
+    def __init__(self, fields, ordering, transforms=None):
+        self.fields = fields
+        self.ordering = ordering
+        self.transforms = transforms or {}
+
+    def get_names(self, request):
+        fields = request.GET.get('fields')
+        if not fields:
+            return list(self.fields)
+        names = list(dict.fromkeys(
+            name.strip() for name in fields.split(',') if name.strip()
+        ))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise ApiError(
+                f'Неизвестные поля: {", ".join(unknown)}. '
+                f'Доступны: {", ".join(self.fields)}'
+            )
+        return names
+
+    def serialize(self, rows, names):
+        transforms = [
+            (index, self.transforms[name])
+            for index, name in enumerate(names) if name in self.transforms
+        ]
+        result = []
+        for row in rows:
+            if transforms:
+                row = list(row)
+                for index, transform in transforms:
+                    row[index] = transform(row[index])
+            result.append(dict(zip(names, row)))
+        return result
+
+    def _columns(self, names):
+        return [self.fields[name] for name in names]
+
+    def detail(self, request, queryset):
+        names = self.get_names(request)
+        row = queryset.values_list(*self._columns(names)).first()
+        if row is None:
+            raise ApiError('Не найдено', status=404)
+        return self.serialize([row], names)[0]
+
+    def page(self, request, queryset):
+        """Страница по курсору: колонки сортировки выбираются всегда,
+        но в ответ попадают, только если запрошены."""
+        names = self.get_names(request)
+        keys = [name.lstrip('-') for name in self.ordering]
+        columns = list(dict.fromkeys(self._columns(names) + keys))
+        try:
+            limit = int(request.GET.get('limit', API_PAGE_SIZE))
+        except ValueError:
+            raise ApiError('limit должен быть числом')
+        page = CursorPaginator(
+            queryset.values(*columns),
+            min(max(limit, 1), API_MAX_PAGE_SIZE),
+            ordering=self.ordering
+        ).get_page(request.GET.get('cursor'))
+        selected = self._columns(names)
+        return {
+            'results': self.serialize(
+                ([item[column] for column in selected] for item in page),
+                names
+            ),
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        }
+
+
+POSTS = Resource(
+    {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'updated_at': 'updated_at',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+        'comments_count': 'comments_count',
+    },
+    ordering=('-pub_date', '-id'),
+    transforms={'image': _media_url}
+)
+GROUPS = Resource(
+    {'slug': 'slug', 'title': 'title', 'description': 'description'},
+    ordering=('id',)
+)
+PROFILES = Resource(
+    {
+        'username': 'username',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'posts_count': 'profile__posts_count',
+        'followers_count': 'profile__followers_count',
+        'following_count': 'profile__following_count',
+    },
+    ordering=('id',)
+)
+COMMENTS = Resource(
+    {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    },
+    ordering=('created', 'id')
+)
+
+
+def _response(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}
+    )
+
+
+def api_view(view):
+    """GET/HEAD, чтение с реплики, ошибки ApiError — JSON с кодом."""
+    @wraps(view)
+    @require_safe
+    @read_replica
+    def wrapper(request, *args, **kwargs):
+        try:
+            return _response(view(request, *args, **kwargs))
+        except ApiError as error:
+            return _response({'error': str(error)}, error.status)
+    return wrapper
+
+
+def _exists(queryset):
+    if not queryset.exists():
+        raise ApiError('Не найдено', status=404)
+
+
+@api_view
+def post_list(request):
+    """Посты; фильтры ?group=slug и ?author=username."""
+    posts = Post.objects.all()
+    if request.GET.get('group'):
+        posts = posts.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        posts = posts.filter(author__username=request.GET['author'])
+    return POSTS.page(request, posts)
+
+
+@api_view
+def post_detail(request, post_id):
+    return POSTS.detail(request, Post.objects.filter(pk=post_id))
+
+
+@api_view
+def post_comments(request, post_id):
+    _exists(Post.objects.filter(pk=post_id))
+    return COMMENTS.page(request, Comment.objects.filter(post_id=post_id))
+
+
+@api_view
+def group_list(request):
+    return GROUPS.page(request, Group.objects.all())
+
+
+@api_view
+def group_detail(request, slug):
+    return GROUPS.detail(request, Group.objects.filter(slug=slug))
+
+
+@api_view
+def group_posts(request, slug):
+    _exists(Group.objects.filter(slug=slug))
+    return POSTS.page(request, Post.objects.filter(group__slug=slug))
+
+
+@api_view
+def profile_detail(request, username):
+    return PROFILES.detail(request, User.objects.filter(username=username))
+
+
+@api_view
+def profile_posts(request, username):
+    _exists(User.objects.filter(username=username))
+    return POSTS.page(
+        request, Post.objects.filter(author__username=username)
+    )
+
+
+@api_view
+def follow_feed(request):
+    """Лента подписок текущего пользователя (сессия сайта)."""
+    if not request.user.is_authenticated:
+        raise ApiError('Требуется авторизация', status=401)
+    return POSTS.page(request, get_follow_feed(request.user))
@@ -4,3 +4,21 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     name = "posts"
     verbose_name = "Посты"
+
+    def ready(self):
+        from core.metrics import registry
+
+        from . import images, signals  # noqa: F401
+
+        registry.register_gauge(
+            'yatube_thumbnail_queue_depth',
+            'Картинки в очереди на генерацию вариантов.',
+            lambda: images.metrics()['queue_depth']
+        )
+        for result in ('generated', 'failed'):
+            registry.register_gauge(
+                f'yatube_thumbnails_{result}_total',
+                f'Картинки, обработанные в фоне ({result}).',
+                lambda result=result: images.metrics()[result],
+                kind='counter'
+            )
@@ -0,0 +1,267 @@
+"""Сценарии нагрузочного теста представлений и сравнение с эталоном.
+
+Запросы выполняются тестовым клиентом Django в том же процессе: сеть
+и веб-сервер не участвуют, измеряется стоимость самого представления
+(SQL, шаблоны, кэш). Всё, что сценарии пишут в базу, откатывается, а
+вместо кэша default используется кэш BENCHMARK_CACHE. Отдельно
+меряется рендеринг страниц лент при разных загрузчиках шаблонов
+(render_feeds).
+"""
+import json
+import random
+import statistics
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.template.backends.django import DjangoTemplates
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Follow, Group, Post, User
+from .settings import BENCHMARK_CACHE, PAGINATOR_NUM_PAGES
+
+PERCENTILES = (50, 95, 99)
+BASE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Режимы загрузки шаблонов: без кэша (как при DEBUG), с кэшем
+# скомпилированных шаблонов и с подстановкой include (как в settings_prod).
+TEMPLATE_MODES = {
+    'uncached': BASE_LOADERS,
+    'cached': [('django.template.loaders.cached.Loader', BASE_LOADERS)],
+    'inlined': [('core.template_loaders.Loader', BASE_LOADERS)],
+}
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    values = sorted(values)
+    rank = max(int(round(percent / 100 * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def build_scenarios(rng):
+    """Сценарии по горячим представлениям: имя -> функция без
+    аргументов, выполняющая один запрос. Объекты выбираются с перекосом
+    в популярные, как в реальной нагрузке."""
+    post_ids = list(Post.objects.order_by('-comments_count').values_list(
+        'pk', flat=True
+    )[:1000])
+    if not post_ids:
+        raise ValueError('В базе нет постов')
+    usernames = list(User.objects.filter(
+        profile__posts_count__gt=0
+    ).order_by('-profile__followers_count').values_list(
+        'username', flat=True
+    )[:1000])
+    slugs = list(Group.objects.order_by('pk').values_list(
+        'slug', flat=True
+    )[:1000])
+    follower = User.objects.filter(
+        pk__in=Follow.objects.values('user')
+    ).order_by('-profile__following_count').first()
+    reader = Client()
+    if follower is not None:
+        reader.force_login(follower)
+    writer = Client()
+    writer.force_login(User.objects.order_by('pk').first())
+
+    def popular(items):
+        return items[min(int(rng.paretovariate(1.2)) - 1, len(items) - 1)]
+
+    scenarios = {
+        'index': lambda: reader.get(reverse('posts:index')),
+        'profile': lambda: reader.get(reverse(
+            'posts:profile', kwargs={'username': popular(usernames)}
+        )),
+        'post_detail': lambda: reader.get(reverse(
+            'posts:post_detail', kwargs={'post_id': popular(post_ids)}
+        )),
+        'api_posts': lambda: reader.get(reverse('api:post_list')),
+        'api_posts_sparse': lambda: reader.get(
+            reverse('api:post_list'), {'fields': 'id,author,pub_date'}
+        ),
+        'api_profile_posts': lambda: reader.get(reverse(
+            'api:profile_posts', kwargs={'username': popular(usernames)}
+        )),
+        'add_comment': lambda: writer.post(
+            reverse('posts:add_comment',
+                    kwargs={'post_id': rng.choice(post_ids)}),
+            {'text': 'Комментарий нагрузочного теста'}
+        ),
+    }
+    if slugs:
+        scenarios['group_list'] = lambda: reader.get(reverse(
+            'posts:group_list', kwargs={'slug': popular(slugs)}
+        ))
+    if follower is not None:
+        scenarios['follow_index'] = lambda: reader.get(
+            reverse('posts:follow_index')
+        )
+    return scenarios
+
+
+def run_scenario(request, requests, warmup=5, cold=False):
+    for _ in range(warmup):
+        request()
+    timings = []
+    queries = []
+    sizes = []
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = request()
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f'{response.status_code} от {response.request["PATH_INFO"]}'
+            )
+        queries.append(len(context))
+        sizes.append(len(response.content))
+    result = {
+        f'p{percent}_ms': round(percentile(timings, percent), 2)
+        for percent in PERCENTILES
+    }
+    result['mean_queries'] = round(statistics.mean(queries), 2)
+    result['max_queries'] = max(queries)
+    result['mean_bytes'] = round(statistics.mean(sizes))
+    return result
+
+
+def run(requests, warmup=5, cold=False, seed=0, only=None):
+    """Сценарии выполняются в транзакции, которая затем откатывается
+    (комментарии add_comment, сессии клиентов), с кэшем BENCHMARK_CACHE
+    вместо default: --cold очищает только его."""
+    with override_settings(CACHES={
+        **settings.CACHES,
+        'default': settings.CACHES[BENCHMARK_CACHE],
+    }), transaction.atomic():
+        scenarios = build_scenarios(random.Random(seed))
+        results = {
+            name: run_scenario(request, requests, warmup, cold)
+            for name, request in scenarios.items()
+            if not only or name in only
+        }
+        transaction.set_rollback(True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Регрессии относительно эталона: p95 выросло больше чем
+    на tolerance или запросов к базе стало больше."""
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        limit = expected['p95_ms'] * (1 + tolerance)
+        if result['p95_ms'] > limit:
+            regressions.append(
+                f'{name}: p95 {result["p95_ms"]} мс > {limit:.2f} мс'
+            )
+        if result['max_queries'] > expected['max_queries']:
+            regressions.append(
+                f'{name}: {result["max_queries"]} SQL-запросов > '
+                f'{expected["max_queries"]}'
+            )
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_baseline(path, results):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2,
+                  sort_keys=True)
+
+
+def make_template_backend(mode):
+    """Движок шаблонов с настройками проекта и загрузчиками режима."""
+    params = settings.TEMPLATES[0]
+    return DjangoTemplates({
+        'NAME': f'benchmark-{mode}',
+        'DIRS': params['DIRS'],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **params['OPTIONS'],
+            'debug': False,
+            'loaders': TEMPLATE_MODES[mode],
+        },
+    })
+
+
+def _first_page(posts):
+    page = Paginator(posts, PAGINATOR_NUM_PAGES).get_page(1)
+    page.object_list = list(page.object_list)
+    return page
+
+
+def build_feed_pages():
+    """Первые страницы лент: шаблон -> контекст. Группа и автор берутся
+    самые наполненные, чтобы на странице было PAGINATOR_NUM_PAGES
+    постов."""
+    pages = {'posts/index.html': {'page_obj': _first_page(
+        Post.objects.feed()
+    )}}
+    group = Group.objects.order_by('-posts__pub_date').first()
+    if group is not None:
+        pages['posts/group_list.html'] = {
+            'group': group,
+            'is_group': True,
+            'page_obj': _first_page(group.posts.feed()),
+        }
+    author = User.objects.select_related('profile').order_by(
+        '-profile__posts_count'
+    ).first()
+    if author is not None:
+        pages['posts/profile.html'] = {
+            'author': author,
+            'following': False,
+            'page_obj': _first_page(author.posts.feed()),
+        }
+    return pages
+
+
+def render_feeds(requests=200, warmup=10, modes=None):
+    """Время рендеринга первых страниц лент по режимам загрузки шаблонов:
+    {режим: {шаблон: перцентили в мс}}. Кэш фрагментов обходится
+    уникальным ключом, так что каждый раз рендерится вся страница."""
+    request = RequestFactory().get(reverse('posts:index'))
+    request.user = AnonymousUser()
+    pages = build_feed_pages()
+    results = {}
+    for mode in modes or TEMPLATE_MODES:
+        backend = make_template_backend(mode)
+        results[mode] = {}
+        for template_name, context in pages.items():
+            def render():
+                backend.get_template(template_name).render({
+                    **context,
+                    'feed_cache_key': uuid4().hex,
+                    'feed_cache_time': 0,
+                }, request)
+
+            for _ in range(warmup):
+                render()
+            timings = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                render()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[mode][template_name] = {
+                f'p{percent}_ms': round(percentile(timings, percent), 3)
+                for percent in PERCENTILES
+            }
+    return results
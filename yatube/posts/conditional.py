@@ -0,0 +1,41 @@
+"""Условные GET-запросы: ETag для лент и страницы поста.
+
+ETag собирается из того, что представление уже получило до
+рендеринга: версий лент (feed_cache), полей поста и состояния
+посетителя. Если клиент прислал совпадающий ETag, шаблон не
+рендерится и отдаётся 304. Last-Modified не выставляется: страница
+зависит не только от поста, но и от автора, группы и версий лент, и
+одна дата не описывает всех изменений.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+
+def make_etag(request, *parts):
+    """ETag страницы. Кроме переданных частей учитывает пользователя
+    и CSRF-cookie: от них зависят шапка и токены в формах."""
+    parts = (
+        request.user.pk,
+        request.META.get('CSRF_COOKIE', ''),
+        request.GET.urlencode(),
+    ) + parts
+    return quote_etag(hashlib.md5(
+        ':'.join(map(str, parts)).encode()
+    ).hexdigest())
+
+
+def conditional_response(request, render, etag):
+    """Ответ 304, если ETag клиента совпадает, иначе результат render();
+    ETag выставляется в обоих случаях."""
+    response = None
+    if request.method in ('GET', 'HEAD'):
+        response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = render()
+    if request.method in ('GET', 'HEAD') and response.status_code in (
+        200, 304
+    ):
+        response.setdefault('ETag', etag)
+    return response
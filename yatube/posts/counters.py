@@ -0,0 +1,60 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, Profile, User
+
+
+def _add(queryset, field, delta):
+    queryset.update(**{field: F(field) + delta})
+
+
+def change_posts_count(author_id, delta):
+    _add(Profile.objects.filter(user_id=author_id), 'posts_count', delta)
+
+
+def change_comments_count(post_id, delta):
+    # updated_at не трогаем: от него зависит кэш фрагментов постов в
+    # лентах, где комментарии не выводятся; ETag страницы поста и так
+    # учитывает comments_count.
+    _add(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def change_follow_counts(user_id, author_id, delta):
+    change_many_follow_counts(user_id, [author_id], delta)
+
+
+def change_many_follow_counts(user_id, author_ids, delta):
+    """Сдвигает счётчики сразу для нескольких подписок user_id: два
+    UPDATE независимо от числа подписчиков у авторов."""
+    _add(
+        Profile.objects.filter(user_id__in=author_ids),
+        'followers_count',
+        delta
+    )
+    _add(
+        Profile.objects.filter(user_id=user_id),
+        'following_count',
+        delta * len(author_ids)
+    )
+
+
+def _count(queryset, field, outer='user'):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef(outer)}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def recount_counters():
+    """Пересчитывает все счётчики по фактическим данным."""
+    Profile.objects.bulk_create(
+        (Profile(user_id=user_id) for user_id in User.objects.filter(
+            profile__isnull=True
+        ).values_list('pk', flat=True))
+    )
+    Profile.objects.update(
+        posts_count=_count(Post.objects, 'author'),
+        followers_count=_count(Follow.objects, 'author'),
+        following_count=_count(Follow.objects, 'user'),
+    )
+    Post.objects.update(comments_count=_count(Comment.objects, 'post', 'pk'))
@@ -0,0 +1,108 @@
+"""Потоковая выгрузка постов, комментариев и подписок в NDJSON или CSV.
+
+Строки читаются пачками по первичному ключу (WHERE id > последний
+LIMIT n), а не одним курсором: в профиле с PgBouncer серверные курсоры
+отключены, и iterator() получил бы от PostgreSQL всю таблицу разом.
+Так в памяти всегда не больше одной пачки, сколько бы ни было строк.
+"""
+import csv
+import io
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.text import compress_sequence
+
+from .models import Comment, Follow, Post
+from .settings import EXPORT_CHUNK_SIZE
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+# Имя в выгрузке -> колонка для values_list; первая — первичный ключ.
+EXPORTS = {
+    'posts': (Post, {
+        'id': 'id',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'updated_at': 'updated_at',
+        'image': 'image',
+        'comments_count': 'comments_count',
+    }),
+    'comments': (Comment, {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }),
+    'follows': (Follow, {
+        'id': 'id',
+        'user': 'user__username',
+        'author': 'author__username',
+    }),
+}
+
+
+def iter_batches(kind, chunk_size=EXPORT_CHUNK_SIZE):
+    """Пачки строк (кортежей) выгрузки kind по возрастанию id."""
+    model, fields = EXPORTS[kind]
+    queryset = model.objects.order_by('pk').values_list(*fields.values())
+    last = None
+    while True:
+        batch = queryset if last is None else queryset.filter(pk__gt=last)
+        rows = list(batch[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][0]
+
+
+class ExportEncoder(DjangoJSONEncoder):
+    """Даты с микросекундами, как в CSV: DjangoJSONEncoder обрезает их
+    до миллисекунд."""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _ndjson(names, batches):
+    encoder = ExportEncoder(ensure_ascii=False, separators=(',', ':'))
+    for rows in batches:
+        yield ''.join(
+            encoder.encode(dict(zip(names, row))) + '\n' for row in rows
+        )
+
+
+def _csv(names, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream(kind, export_format='ndjson', gzip=False,
+           chunk_size=EXPORT_CHUNK_SIZE):
+    """Выгрузка kind кусками байтов: по куску на пачку строк."""
+    names = list(EXPORTS[kind][1])
+    render = _ndjson if export_format == 'ndjson' else _csv
+    chunks = (
+        text.encode()
+        for text in render(names, iter_batches(kind, chunk_size))
+    )
+    return compress_sequence(chunks) if gzip else chunks
+
+
+def filename(kind, export_format, gzip=False):
+    name = f'{kind}.{FORMATS[export_format][1]}'
+    return name + '.gz' if gzip else name
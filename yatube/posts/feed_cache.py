@@ -0,0 +1,126 @@
+import hashlib
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from core.routers import use_primary
+
+from . import timeline
+from .models import Follow, Post
+from .settings import FEED_CACHE_TIME
+
+VERSION_KEY = 'feed-version:{}'
+COUNT_KEY = 'feed-count:{}'
+ALL_FEEDS = 'all'
+INDEX_FEED = 'index'
+# Версия кэша фрагментов постов (posts.fragments): сдвигается, когда
+# меняется вид сразу многих постов, например после generate_thumbnails.
+POST_FRAGMENTS = 'post-fragments'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def profile_feed(author_id):
+    return f'profile:{author_id}'
+
+
+def follow_feed(user_id):
+    return f'follow:{user_id}'
+
+
+def get_versions(*feeds):
+    """Текущие версии лент; отсутствующие в кэше создаются заново."""
+    keys = [VERSION_KEY.format(feed) for feed in feeds]
+    versions = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump(*feeds):
+    """Сдвигает версии лент: закэшированные страницы становятся
+    недоступны и со временем вытесняются из кэша."""
+    cache.set_many(
+        {VERSION_KEY.format(feed): uuid4().hex for feed in feeds},
+        timeout=None
+    )
+
+
+def bump_post(post, old_group_id=None):
+    """Сдвигает версии лент, в которых выводится пост."""
+    feeds = [INDEX_FEED, profile_feed(post.author_id)]
+    feeds.extend(
+        group_feed(group_id)
+        for group_id in {post.group_id, old_group_id} - {None}
+    )
+    if timeline.is_fanout_author(post.author_id):
+        feeds.extend(
+            follow_feed(user_id) for user_id in Follow.objects.filter(
+                author_id=post.author_id
+            ).values_list('user_id', flat=True).iterator()
+        )
+    bump(*feeds)
+
+
+def bump_author(author_id):
+    """Сдвигает версии лент, в которых выводятся посты автора, — при
+    смене его имени."""
+    feeds = [INDEX_FEED, profile_feed(author_id)]
+    feeds.extend(
+        group_feed(group_id) for group_id in Post.objects.filter(
+            author_id=author_id, group__isnull=False
+        ).values_list('group_id', flat=True).distinct()
+    )
+    feeds.extend(
+        follow_feed(user_id) for user_id in Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True).iterator()
+    )
+    bump(*feeds)
+
+
+def bump_group(group_id):
+    """Сдвигает версии лент при изменении или удалении группы: её
+    название и ссылка выводятся в постах всех лент, поэтому вместе
+    с лентой группы сдвигается и общая версия."""
+    bump(ALL_FEEDS, group_feed(group_id))
+
+
+def get_follow_feeds(user, authors=None):
+    """Ленты, от которых зависит лента подписок пользователя: его
+    материализованная лента и профили популярных авторов из подписок
+    (authors, если они уже прочитаны)."""
+    if authors is None:
+        authors = timeline.pull_authors(user).values_list(
+            'author', flat=True
+        )
+    return [follow_feed(user.pk)] + [
+        profile_feed(author_id) for author_id in authors
+    ]
+
+
+def get_count(items, versions):
+    """Число записей ленты, закэшированное под версиями её лент: номер
+    страницы проверяется без COUNT на каждый запрос. Как и страница,
+    считается по основной базе (см. views.get_feed_context)."""
+    key = COUNT_KEY.format(
+        hashlib.md5(':'.join(versions).encode()).hexdigest()
+    )
+    count = cache.get(key)
+    if count is None:
+        with use_primary():
+            count = items.count()
+        cache.set(key, count, FEED_CACHE_TIME)
+    return count
+
+
+def page_key(versions, position):
+    """Ключ фрагмента страницы: версии лент и позиция страницы, уже
+    проверенная пагинатором (номер или курсор в каноническом виде).
+    Сырые page и cursor в ключ не попадают, иначе каждое новое значение
+    в адресе заводило бы новую запись в кэше."""
+    return ':'.join(versions + [str(position)])
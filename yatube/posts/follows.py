@@ -0,0 +1,141 @@
+"""Подписки одним SQL-запросом.
+
+Вставка и удаление выполняются одним оператором без предварительной
+проверки, поэтому повторный или одновременный клик ничего не ломает:
+дубликаты отсекает ограничение unique_follow. Сигналы модели Follow
+при этом не срабатывают, и побочные эффекты (счётчики, ленты, кэш)
+выполняются здесь явно и идемпотентно.
+
+Без RETURNING изменившиеся подписки вычисляются по чтению до записи.
+Чтобы параллельный запрос того же пользователя не вклинился между
+чтением и записью, перед чтением берётся блокировка (см. _lock_user).
+"""
+import sqlite3
+
+from django.db import connections, router, transaction
+from django.db.models import F
+
+from . import counters, feed_cache, timeline
+from .models import Follow, Profile, User
+
+
+def _supports_returning(connection):
+    if connection.vendor == 'postgresql':
+        return True
+    return (connection.vendor == 'sqlite'
+            and sqlite3.sqlite_version_info >= (3, 35))
+
+
+def _execute(connection, sql, params):
+    """Выполняет запрос и возвращает id затронутых авторов. Если СУБД
+    не умеет RETURNING, возвращает None."""
+    returning = _supports_returning(connection)
+    if returning:
+        sql += ' RETURNING author_id'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        if returning:
+            return [row[0] for row in cursor.fetchall()]
+    return None
+
+
+def _authors_sql(connection, usernames):
+    placeholders = ', '.join(['%s'] * len(usernames))
+    return (
+        f'SELECT {connection.ops.quote_name("id")} '
+        f'FROM {connection.ops.quote_name(User._meta.db_table)} '
+        f'WHERE {connection.ops.quote_name("username")} '
+        f'IN ({placeholders})'
+    )
+
+
+def _lock_user(user):
+    """Пустая запись в профиль user: в SQLite она сразу берёт
+    блокировку записи для всей транзакции (BEGIN у Django отложенный),
+    в остальных СУБД — блокировку строки профиля."""
+    Profile.objects.filter(user=user).update(
+        following_count=F('following_count')
+    )
+
+
+def _followed_ids(user, usernames):
+    return set(Follow.objects.filter(
+        user=user, author__username__in=usernames
+    ).values_list('author_id', flat=True))
+
+
+def _after_change(user, author_ids, delta):
+    counters.change_many_follow_counts(user.pk, author_ids, delta)
+    if delta < 0:
+        timeline.backfill_authors(author_ids)
+    feed_cache.bump(feed_cache.follow_feed(user.pk))
+
+
+@transaction.atomic
+def follow(user, usernames):
+    """Подписывает user на авторов с именами из usernames (кроме себя).
+    Возвращает id авторов, подписка на которых появилась сейчас."""
+    usernames = list(dict.fromkeys(usernames))
+    if not usernames:
+        return []
+    connection = connections[router.db_for_write(Follow)]
+    quote = connection.ops.quote_name
+    authors = _authors_sql(connection, usernames)
+    if not _supports_returning(connection):
+        # Без RETURNING новые подписки — это найденные авторы за вычетом
+        # тех, на кого user уже подписан.
+        _lock_user(user)
+        followed = _followed_ids(user, usernames)
+    author_ids = _execute(
+        connection,
+        f'INSERT INTO {quote(Follow._meta.db_table)} '
+        f'({quote("user_id")}, {quote("author_id")}) '
+        f'SELECT %s, {quote("id")} FROM ({authors}) '
+        f'AS authors WHERE {quote("id")} <> %s '
+        f'ON CONFLICT ({quote("user_id")}, {quote("author_id")}) '
+        f'DO NOTHING',
+        [user.pk, *usernames, user.pk]
+    )
+    if author_ids is None:
+        author_ids = [
+            author_id for author_id in User.objects.filter(
+                username__in=usernames
+            ).values_list('pk', flat=True)
+            if author_id != user.pk and author_id not in followed
+        ]
+    if author_ids:
+        _after_change(user, author_ids, 1)
+    # После счётчиков: add_author решает по новому числу подписчиков,
+    # рассылаются ли посты автора (см. timeline.is_fanout_author).
+    for author_id in author_ids:
+        timeline.add_author(user.pk, author_id)
+    return author_ids
+
+
+@transaction.atomic
+def unfollow(user, usernames):
+    """Отписывает user от авторов с именами из usernames. Возвращает id
+    авторов, подписка на которых была удалена."""
+    usernames = list(dict.fromkeys(usernames))
+    if not usernames:
+        return []
+    connection = connections[router.db_for_write(Follow)]
+    quote = connection.ops.quote_name
+    authors = _authors_sql(connection, usernames)
+    if not _supports_returning(connection):
+        _lock_user(user)
+        followed = _followed_ids(user, usernames)
+    author_ids = _execute(
+        connection,
+        f'DELETE FROM {quote(Follow._meta.db_table)} '
+        f'WHERE {quote("user_id")} = %s '
+        f'AND {quote("author_id")} IN ({authors})',
+        [user.pk, *usernames]
+    )
+    if author_ids is None:
+        author_ids = list(followed)
+    for author_id in author_ids:
+        timeline.remove_author(user.pk, author_id)
+    if author_ids:
+        _after_change(user, author_ids, -1)
+    return author_ids
@@ -1,12 +1,25 @@
 from django import forms
 
 from .models import Comment, Post
+from .uploads import process_image
+
+
+class ImageUploadField(forms.FileField):
+    """Поле картинки: проверка и перекодирование вместо полной проверки
+    Pillow в forms.ImageField (см. uploads.process_image)."""
+
+    def to_python(self, data):
+        data = super().to_python(data)
+        if data is None:
+            return None
+        return process_image(data)
 
 
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
+        field_classes = {'image': ImageUploadField}
 
 
 class CommentForm(forms.ModelForm):
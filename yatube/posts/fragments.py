@@ -0,0 +1,61 @@
+"""Кэш HTML отдельных постов для лент.
+
+Пост выглядит одинаково в ленте главной, профиля и подписок (в ленте
+группы — без ссылки на группу), поэтому его фрагмент рендерится один
+раз и переиспользуется всеми лентами. Ключ фрагмента неизменяем: в нём
+updated_at поста и отпечаток имён автора и группы, так что правка поста
+или переименование дают новый ключ, а старый вытесняется из кэша сам.
+Страница ленты собирает фрагменты одним get_many.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import get_template
+
+from . import feed_cache
+from .settings import POST_FRAGMENT_CACHE_TIME
+
+FRAGMENT_KEY = 'post-fragment:{}:{}:{}:{}:{}'
+POST_TEMPLATE = 'posts/includes/post.html'
+
+
+def _names_stamp(post):
+    group = post.group
+    names = (
+        post.author.username,
+        post.author.first_name,
+        post.author.last_name,
+        group.slug if group else '',
+        group.title if group else '',
+    )
+    return hashlib.md5('\n'.join(names).encode()).hexdigest()[:12]
+
+
+def fragment_key(post, is_group, version):
+    return FRAGMENT_KEY.format(
+        version,
+        post.pk,
+        post.updated_at.timestamp(),
+        int(is_group),
+        _names_stamp(post)
+    )
+
+
+def render_posts(posts, is_group=False):
+    """HTML постов в том же порядке. Посты должны быть загружены
+    через Post.objects.feed()."""
+    posts = list(posts)
+    version, = feed_cache.get_versions(feed_cache.POST_FRAGMENTS)
+    keys = [fragment_key(post, is_group, version) for post in posts]
+    fragments = cache.get_many(keys)
+    missing = {}
+    for post, key in zip(posts, keys):
+        if key not in fragments:
+            missing[key] = get_template(POST_TEMPLATE).render({
+                'post': post,
+                'is_group': is_group,
+            })
+    if missing:
+        cache.set_many(missing, POST_FRAGMENT_CACHE_TIME)
+        fragments.update(missing)
+    return [fragments[key] for key in keys]
@@ -0,0 +1,171 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import feed_cache
+from .models import Post
+from .settings import (IMAGE_BASE_SIZE, IMAGE_VARIANT_FORMATS,
+                       IMAGE_VARIANT_QUALITY, IMAGE_VARIANT_WIDTHS,
+                       IMAGE_VARIANTS_DIR, THUMBNAIL_WORKERS)
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'AVIF': 'avif', 'WEBP': 'webp', 'JPEG': 'jpg'}
+MIME_TYPES = {'AVIF': 'image/avif', 'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+
+_executor = None
+_lock = threading.Lock()
+_pending = set()
+_metrics = {'generated': 0, 'failed': 0}
+
+
+def get_variants(post):
+    """Готовые варианты картинки поста ({формат: [(ширина, URL), ...]})
+    или None, если они ещё не сгенерированы."""
+    if not post.image_variants:
+        return None
+    return {
+        image_format: [
+            (width, default_storage.url(name)) for width, name in sizes
+        ]
+        for image_format, sizes in json.loads(post.image_variants).items()
+    }
+
+
+def store_variants(name, variants):
+    """Записывает варианты во все посты с картинкой name. Новый
+    updated_at сбрасывает кэш фрагментов этих постов и валидаторы их
+    страниц: заглушка сменится картинкой."""
+    return Post.objects.filter(image=name).update(
+        image_variants=json.dumps(variants),
+        updated_at=timezone.now()
+    )
+
+
+def available_formats():
+    """Форматы из IMAGE_VARIANT_FORMATS, которые умеет кодировать Pillow:
+    AVIF появляется при установленном плагине, WEBP — при сборке
+    с libwebp."""
+    Image.init()
+    return [name for name in IMAGE_VARIANT_FORMATS if name in Image.SAVE]
+
+
+def _variant_widths(image):
+    base_width = IMAGE_BASE_SIZE[0]
+    return [
+        width for width in IMAGE_VARIANT_WIDTHS
+        if width <= max(image.width, base_width)
+    ]
+
+
+def _encode(image, image_format):
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=IMAGE_VARIANT_QUALITY)
+    return buffer.getvalue()
+
+
+def generate_variants(name, overwrite=False):
+    """Кадрирует картинку под пропорции ленты, сохраняет её в нескольких
+    ширинах и форматах и возвращает словарь вариантов
+    {формат: [(ширина, имя файла), ...]}.
+
+    Имена вариантов выводятся из имени исходной картинки, поэтому
+    повторная генерация не плодит копий: уже существующие файлы
+    остаются как есть, а с overwrite перезаписываются."""
+    with default_storage.open(name) as file:
+        image = Image.open(file)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info
+                              else 'RGB')
+    base_width, base_height = IMAGE_BASE_SIZE
+    prefix = os.path.splitext(os.path.basename(name))[0]
+    variants = {}
+    for width in _variant_widths(image):
+        resized = None
+        for image_format in available_formats():
+            path = (
+                f'{IMAGE_VARIANTS_DIR}/{prefix}-{width}.'
+                f'{EXTENSIONS[image_format]}'
+            )
+            if overwrite or not default_storage.exists(path):
+                if resized is None:
+                    resized = ImageOps.fit(
+                        image,
+                        (width, round(width * base_height / base_width)),
+                        Image.LANCZOS
+                    )
+                default_storage.delete(path)
+                path = default_storage.save(
+                    path, ContentFile(_encode(resized, image_format))
+                )
+            variants.setdefault(image_format, []).append((width, path))
+    return variants
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails'
+            )
+        return _executor
+
+
+def _run(post):
+    name = post.image.name
+    try:
+        store_variants(name, generate_variants(name))
+        feed_cache.bump_post(post)
+        result = 'generated'
+    except Exception:
+        result = 'failed'
+        logger.exception('Не удалось создать варианты картинки %s', name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+            _metrics[result] += 1
+
+
+def _work(post):
+    try:
+        _run(post)
+    finally:
+        connections.close_all()
+
+
+def schedule(post):
+    """Ставит генерацию вариантов картинки поста в фоновый пул. Когда
+    они готовы, ленты с постом сбрасываются, чтобы заменить заглушку."""
+    name = post.image.name
+    if not name or post.image_variants:
+        return
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    _get_executor().submit(_work, post)
+
+
+def schedule_on_commit(post):
+    transaction.on_commit(lambda: schedule(post))
+
+
+def metrics():
+    with _lock:
+        queue_depth = len(_pending)
+    return {'queue_depth': queue_depth, **_metrics}
@@ -0,0 +1,317 @@
+"""Массовый импорт групп, постов и комментариев из NDJSON или CSV
+(в том числе .gz), например из выгрузки export_posts.
+
+Файл читается потоково. Авторы и группы ищутся по словарям в памяти,
+загруженным один раз. Записи пишутся через bulk_create пачками, каждая
+пачка — в своей транзакции. После пачки в файл контрольной точки
+записывается число обработанных записей, поэтому прерванный импорт
+продолжается с места остановки. Записи с id сохраняют его: уже
+существующие id (и slug групп) пропускаются, поэтому повтор пачки после
+сбоя между коммитом и записью контрольной точки их не дублирует. Записи
+без id при таком повторе будут записаны второй раз. Комментарии
+ссылаются на посты по id.
+
+Сигналы при bulk_create не срабатывают: счётчики и ленты
+восстанавливаются один раз в конце через finish(), а в поисковый индекс
+добавляются только импортированные посты — по диапазонам их id, которые
+хранятся и в контрольной точке.
+"""
+import csv
+import gzip
+import json
+import os
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .export import FORMATS
+from .models import Comment, Group, Post, User
+from .search import index_posts
+from .seeding import explicit_dates, finalize
+from .settings import IMPORT_BATCH_SIZE
+
+# В таком порядке файлы импортируются: посты ссылаются на группы,
+# комментарии — на посты.
+KINDS = ('groups', 'posts', 'comments')
+MODELS = {'groups': Group, 'posts': Post, 'comments': Comment}
+
+
+class UnknownReference(Exception):
+    """Автор, группа или пост записи не найдены."""
+
+
+def detect_format(path):
+    """Формат по расширению файла (.gz не учитывается) или None."""
+    name = path[:-3] if path.endswith('.gz') else path
+    for import_format, (_, extension) in FORMATS.items():
+        if name.endswith(f'.{extension}'):
+            return import_format
+    return None
+
+
+def read_records(path, import_format):
+    """Записи файла словарями, по одной, не читая файл целиком."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as file:
+        if import_format == 'csv':
+            yield from csv.DictReader(file)
+            return
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def merge_ranges(ranges):
+    """Сливает пересекающиеся и соседние диапазоны id."""
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+class Checkpoint:
+    """Число уже импортированных записей файла и диапазоны id
+    записанных из него постов."""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path) as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            state = {}
+        self.position = state.get('position', 0)
+        self.post_ranges = [
+            tuple(ids) for ids in state.get('post_ranges', ())
+        ]
+
+    def save(self, position, post_ranges=()):
+        # Через временный файл: сбой во время записи не испортит точку.
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump({
+                'position': position,
+                'post_ranges': list(post_ranges),
+            }, file)
+        os.replace(temporary, self.path)
+        self.position = position
+        self.post_ranges = list(post_ranges)
+
+
+def _int(value):
+    return int(value) if value not in (None, '') else None
+
+
+def _date(value):
+    if not value:
+        return None
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(f'Неверная дата: {value}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date, timezone.utc)
+    return date
+
+
+class Importer:
+    """Превращает пачки записей в объекты моделей и пишет их.
+    Пропущенные записи считаются в skipped по причинам."""
+
+    def __init__(self, create_users=False):
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.create_users = create_users
+        self.password = make_password(None)
+        self.imported = Counter()
+        self.skipped = Counter()
+        self.post_ranges = []
+        self.now = timezone.now()
+
+    def _add_users(self, usernames):
+        missing = set(usernames) - set(self.users) - {''}
+        if not missing:
+            return
+        User.objects.bulk_create(
+            (User(username=username, password=self.password)
+             for username in missing),
+            ignore_conflicts=True
+        )
+        # SQLite не возвращает ключи из bulk_create.
+        self.users.update(User.objects.filter(
+            username__in=missing
+        ).values_list('username', 'pk'))
+
+    def _author(self, record):
+        author_id = self.users.get(record.get('author'))
+        if author_id is None:
+            raise UnknownReference('author')
+        return author_id
+
+    def _group(self, record):
+        slug = record.get('group')
+        if not slug:
+            return None
+        group_id = self.groups.get(slug)
+        if group_id is None:
+            raise UnknownReference('group')
+        return group_id
+
+    def group(self, record):
+        return Group(
+            id=_int(record.get('id')),
+            slug=record['slug'],
+            title=record.get('title') or record['slug'],
+            description=record.get('description') or '',
+        )
+
+    def post(self, record):
+        pub_date = _date(record.get('pub_date')) or self.now
+        return Post(
+            id=_int(record.get('id')),
+            text=record['text'],
+            author_id=self._author(record),
+            group_id=self._group(record),
+            pub_date=pub_date,
+            updated_at=_date(record.get('updated_at')) or pub_date,
+            image=record.get('image') or '',
+        )
+
+    def comment(self, record):
+        return Comment(
+            id=_int(record.get('id')),
+            post_id=int(record['post']),
+            author_id=self._author(record),
+            text=record['text'],
+            created=_date(record.get('created')) or self.now,
+        )
+
+    def write(self, kind, records):
+        self.now = timezone.now()
+        if self.create_users and kind != 'groups':
+            self._add_users(record.get('author') or '' for record in records)
+        make = getattr(self, kind[:-1])
+        objects = []
+        for record in records:
+            try:
+                objects.append(make(record))
+            except UnknownReference as error:
+                self.skipped[str(error)] += 1
+            except (KeyError, TypeError, ValueError):
+                self.skipped['invalid'] += 1
+        if kind == 'comments':
+            objects = self._existing_posts(objects)
+        objects = self._new(kind, objects)
+        last_id = None
+        if kind == 'posts' and any(obj.pk is None for obj in objects):
+            last_id = self._last_post_id()
+        MODELS[kind].objects.bulk_create(objects, ignore_conflicts=True)
+        self.imported[kind] += len(objects)
+        if kind == 'posts':
+            self._add_post_ranges(objects, last_id)
+        if kind == 'groups':
+            self.groups.update(Group.objects.filter(
+                slug__in=[group.slug for group in objects]
+            ).values_list('slug', 'pk'))
+
+    def _new(self, kind, objects):
+        """Только записи, которых ещё нет в базе и в пачке: с новым id,
+        а для групп ещё и с новым slug. Так imported считает реально
+        записанные строки, а ignore_conflicts лишь страхует от гонок."""
+        ids = {obj.pk for obj in objects if obj.pk is not None}
+        seen = set(MODELS[kind].objects.filter(
+            pk__in=ids
+        ).values_list('pk', flat=True)) if ids else set()
+        slugs = set(self.groups)
+        new = []
+        for obj in objects:
+            if obj.pk in seen or kind == 'groups' and obj.slug in slugs:
+                self.skipped['exists'] += 1
+                continue
+            if obj.pk is not None:
+                seen.add(obj.pk)
+            if kind == 'groups':
+                slugs.add(obj.slug)
+            new.append(obj)
+        return new
+
+    @staticmethod
+    def _last_post_id():
+        return Post.objects.aggregate(last=Max('pk'))['last'] or 0
+
+    def _add_post_ranges(self, posts, last_id):
+        """Запоминает id записанных постов диапазонами. SQLite не
+        возвращает ключи из bulk_create, поэтому посты без id берутся
+        диапазоном после last_id — максимального id до записи."""
+        ranges = [(post.pk, post.pk) for post in posts if post.pk is not None]
+        if last_id is not None:
+            ranges.append((last_id + 1, self._last_post_id()))
+        self.post_ranges = merge_ranges(self.post_ranges + ranges)
+
+    def _existing_posts(self, comments):
+        posts = set(Post.objects.filter(
+            pk__in={comment.post_id for comment in comments}
+        ).values_list('pk', flat=True))
+        existing = [
+            comment for comment in comments if comment.post_id in posts
+        ]
+        if len(existing) < len(comments):
+            self.skipped['post'] += len(comments) - len(existing)
+        return existing
+
+
+def import_file(importer, kind, path, import_format,
+                batch_size=IMPORT_BATCH_SIZE, checkpoint=None,
+                progress=None):
+    """Импортирует файл пачками с контрольными точками. Возвращает
+    число обработанных записей файла."""
+    checkpoint = checkpoint or Checkpoint(f'{path}.checkpoint')
+    if kind == 'posts':
+        # Посты, записанные до прерывания, тоже попадут в индекс.
+        importer.post_ranges = merge_ranges(
+            importer.post_ranges + checkpoint.post_ranges
+        )
+    records = islice(
+        read_records(path, import_format), checkpoint.position, None
+    )
+    with explicit_dates():
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                return checkpoint.position
+            with transaction.atomic():
+                importer.write(kind, batch)
+            checkpoint.save(
+                checkpoint.position + len(batch),
+                importer.post_ranges if kind == 'posts' else ()
+            )
+            if progress:
+                progress(kind, checkpoint.position)
+
+
+def reset_sequences():
+    """Сдвигает счётчики первичных ключей за импортированные id
+    (PostgreSQL; в SQLite не требуется)."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [Group, Post, Comment, User]
+    )
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def finish(post_ranges=()):
+    """Один раз после всех файлов: ключи, счётчики, ленты и поисковый
+    индекс постов из диапазонов id post_ranges (Importer.post_ranges)."""
+    reset_sequences()
+    finalize()
+    for first, last in post_ranges:
+        index_posts(Post.objects.filter(pk__range=(first, last)))
@@ -0,0 +1,112 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import benchmark, seeding
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks',
+                                'baseline.json')
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест представлений и JSON API: перцентили времени '
+        'ответа, число SQL-запросов и размер ответа по сценариям, '
+        'сравнение с эталоном. Записи сценариев откатываются, кэш '
+        'сайта не используется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed-scale',
+            choices=sorted(seeding.SCALES),
+            help='Перед тестом заполнить базу набором данных этого размера.'
+        )
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на сценарий.')
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Прогревочных запросов на сценарий.')
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Очищать кэш теста (не кэш сайта) перед каждым запросом.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            help='Запустить только этот сценарий (можно несколько раз).'
+        )
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Сохранить результаты как новый эталон.'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Допустимый рост p95 относительно эталона (доля).'
+        )
+        parser.add_argument('--json', action='store_true',
+                            help='Вывести результаты в JSON.')
+
+    def handle(self, *args, **options):
+        if not (options['save_baseline']
+                or os.path.exists(options['baseline'])):
+            raise CommandError(
+                f'Нет эталона {options["baseline"]}: сохраните его с '
+                f'--save-baseline или укажите --baseline'
+            )
+        # При --json в stdout только результаты.
+        status = self.stderr if options['json'] else self.stdout
+        if options['seed_scale']:
+            with transaction.atomic():
+                seeding.seed_database(
+                    **seeding.SCALES[options['seed_scale']],
+                    seed=options['seed']
+                )
+                seeding.finalize()
+        try:
+            results = benchmark.run(
+                options['requests'],
+                options['warmup'],
+                options['cold'],
+                options['seed'],
+                options['scenario'],
+            )
+        except (ValueError, RuntimeError) as error:
+            raise CommandError(error)
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            for name, result in results.items():
+                self.stdout.write(
+                    f'{name:<18} p50 {result["p50_ms"]:>8} мс  '
+                    f'p95 {result["p95_ms"]:>8} мс  '
+                    f'p99 {result["p99_ms"]:>8} мс  '
+                    f'SQL {result["mean_queries"]} (макс. '
+                    f'{result["max_queries"]})  '
+                    f'{result.get("mean_bytes", 0) / 1024:.1f} КБ'
+                )
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(options['baseline']), exist_ok=True)
+            benchmark.save_baseline(options['baseline'], results)
+            status.write(self.style.SUCCESS(
+                f'Эталон сохранён в {options["baseline"]}'
+            ))
+            return
+        regressions = benchmark.compare(
+            results,
+            benchmark.load_baseline(options['baseline']),
+            options['tolerance']
+        )
+        if regressions:
+            raise CommandError(
+                'Регрессия относительно эталона:\n' + '\n'.join(regressions)
+            )
+        status.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,108 @@
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+
+from posts.models import Comment, Post, User
+
+MARKER = 'db_load_test'
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест базы: потоки читают ленты профилей, пока другие '
+        'потоки пишут комментарии. Сравните пропускную способность '
+        'с --settings=yatube.settings и --settings=yatube.settings_prod.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Длительность теста в секундах.'
+        )
+
+    def run(self, kind, operation, stop, timings, errors, lock):
+        try:
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    operation()
+                except DatabaseError:
+                    with lock:
+                        errors[kind] += 1
+                    continue
+                elapsed = time.perf_counter() - started
+                with lock:
+                    timings[kind].append(elapsed)
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        author_ids = list(User.objects.filter(
+            posts__isnull=False
+        ).values_list('pk', flat=True).distinct()[:1000])
+        post_ids = list(Post.objects.values_list('pk', flat=True)[:1000])
+        user_ids = list(User.objects.values_list('pk', flat=True)[:1000])
+        if not post_ids:
+            raise CommandError('В базе нет постов: сначала заполните её.')
+        connection.close()
+
+        def read():
+            list(Post.objects.feed().filter(
+                author_id=random.choice(author_ids)
+            )[:10])
+
+        def write():
+            with transaction.atomic():
+                Comment.objects.create(
+                    post_id=random.choice(post_ids),
+                    author_id=random.choice(user_ids),
+                    text=MARKER
+                )
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        timings = defaultdict(list)
+        errors = defaultdict(int)
+        threads = [
+            threading.Thread(
+                target=self.run,
+                args=(kind, operation, stop, timings, errors, lock)
+            )
+            for kind, operation, count in (
+                ('read', read, options['readers']),
+                ('write', write, options['writers']),
+            )
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        self.stdout.write(
+            f'{connection.vendor}, {connection.settings_dict["ENGINE"]}, '
+            f'{options["readers"]} читателей, {options["writers"]} писателей'
+        )
+        for kind in ('read', 'write'):
+            durations = sorted(timings[kind])
+            if not durations:
+                self.stdout.write(f'{kind}: 0 операций, ошибок {errors[kind]}')
+                continue
+            self.stdout.write(
+                f'{kind}: {len(durations) / options["duration"]:.0f} оп/с, '
+                f'медиана {statistics.median(durations) * 1000:.1f} мс, '
+                f'p95 {durations[int(len(durations) * 0.95)] * 1000:.1f} мс, '
+                f'ошибок {errors[kind]}'
+            )
+        Comment.objects.filter(text=MARKER).delete()
@@ -0,0 +1,56 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, комментарии или подписки в NDJSON или CSV '
+        'пачками по первичному ключу: память не зависит от размера таблицы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            choices=sorted(export.EXPORTS),
+            default='posts'
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(export.FORMATS),
+            default='ndjson'
+        )
+        parser.add_argument('--gzip', action='store_true',
+                            help='Сжимать на лету.')
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='Файл для выгрузки; по умолчанию стандартный вывод.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=export.EXPORT_CHUNK_SIZE,
+            help='Строк в одном запросе к базе.'
+        )
+
+    def handle(self, *args, **options):
+        chunks = export.stream(
+            options['kind'],
+            options['format'],
+            options['gzip'],
+            options['chunk_size']
+        )
+        if options['output'] != '-':
+            with open(options['output'], 'wb') as file:
+                for chunk in chunks:
+                    file.write(chunk)
+        elif options['gzip']:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending='')
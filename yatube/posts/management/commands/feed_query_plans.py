@@ -0,0 +1,71 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from posts.models import Comment, Follow, Group, Post, Profile
+from posts.settings import PAGINATOR_NUM_PAGES
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит планы и время запросов горячих путей лент: главная, '
+        'профиль, группа, комментарии поста и проверка подписки. Для '
+        'сравнения запустите до и после миграции с индексами на одной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Сколько раз выполнить каждый запрос для замера времени.'
+        )
+
+    def get_queries(self):
+        profile = Profile.objects.order_by('-posts_count').first()
+        group = Group.objects.annotate(
+            total=Count('posts')
+        ).order_by('-total').first()
+        post = Post.objects.order_by('-comments_count').first()
+        follow = Follow.objects.first()
+        queries = {}
+        if post is not None:
+            queries['Главная лента'] = Post.objects.feed()[
+                :PAGINATOR_NUM_PAGES
+            ]
+        if profile is not None:
+            queries['Лента профиля'] = Post.objects.feed().filter(
+                author=profile.user_id
+            )[:PAGINATOR_NUM_PAGES]
+        if group is not None:
+            queries['Лента группы'] = Post.objects.feed().filter(
+                group=group
+            )[:PAGINATOR_NUM_PAGES]
+        if post is not None:
+            queries['Комментарии поста'] = Comment.objects.filter(post=post)
+        if follow is not None:
+            queries['Проверка подписки'] = Follow.objects.filter(
+                user=follow.user_id,
+                author=follow.author_id
+            )[:1]
+        return queries
+
+    def handle(self, *args, **options):
+        queries = self.get_queries()
+        if not queries:
+            self.stdout.write('База пуста: нечего измерять.')
+            return
+        for title, queryset in queries.items():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(queryset.explain())
+            self.stdout.write(
+                f'медиана {statistics.median(timings):.2f} мс, '
+                f'максимум {max(timings):.2f} мс\n'
+            )
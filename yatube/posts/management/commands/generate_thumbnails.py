@@ -0,0 +1,71 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import feed_cache
+from posts.images import generate_variants, store_variants
+from posts.models import Post
+
+logger = logging.getLogger(__name__)
+
+
+def generate(name, overwrite=False):
+    try:
+        return name, generate_variants(name, overwrite)
+    except Exception:
+        logger.exception('Не удалось создать варианты картинки %s', name)
+        return name, None
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует варианты всех картинок постов (размеры и форматы) '
+        'в нескольких процессах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Число процессов.'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Генерировать заново и перезаписывать уже готовые '
+                 'варианты.'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['force']:
+            posts = posts.filter(image_variants='')
+        names = list(
+            posts.order_by().values_list('image', flat=True).distinct()
+        )
+        connections.close_all()
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for name, variants in pool.map(
+                partial(generate, overwrite=options['force']),
+                names,
+                chunksize=16
+            ):
+                if variants is None:
+                    failed += 1
+                    continue
+                store_variants(name, variants)
+                done += 1
+                if done % 100 == 0:
+                    self.stdout.write(f'{done} из {len(names)}')
+        feed_cache.bump(feed_cache.ALL_FEEDS, feed_cache.POST_FRAGMENTS)
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок обработано: {done}, с ошибкой: {failed}'
+        ))
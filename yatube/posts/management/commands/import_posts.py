@@ -0,0 +1,106 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importing
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует группы, посты и комментарии из NDJSON или CSV '
+        '(можно .gz) пачками через bulk_create. Прерванный импорт '
+        'продолжается с контрольной точки; счётчики и ленты '
+        'пересчитываются, а импортированные посты добавляются в поисковый '
+        'индекс один раз в конце. Записи с уже '
+        'существующим id пропускаются; записи без id при повторе пачки '
+        'после сбоя могут задвоиться, поэтому для переноса лучше '
+        'выгружать id.'
+    )
+
+    def add_arguments(self, parser):
+        for kind in importing.KINDS:
+            parser.add_argument(
+                f'--{kind}',
+                metavar='PATH',
+                help=f'Файл с записями {kind}.'
+            )
+        parser.add_argument(
+            '--format',
+            choices=sorted(importing.FORMATS),
+            help='Формат файлов; по умолчанию — по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=importing.IMPORT_BATCH_SIZE,
+            help='Записей в одной транзакции.'
+        )
+        parser.add_argument(
+            '--create-users',
+            action='store_true',
+            help='Создавать неизвестных авторов (без пароля); иначе их '
+                 'записи пропускаются.'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать заново, не учитывая контрольные точки.'
+        )
+
+    def handle(self, *args, **options):
+        files = [
+            (kind, options[kind]) for kind in importing.KINDS
+            if options[kind]
+        ]
+        if not files:
+            raise CommandError(
+                'Укажите хотя бы один файл: --groups, --posts или --comments'
+            )
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должно быть не меньше 1')
+        formats = {}
+        for kind, path in files:
+            if not os.path.exists(path):
+                raise CommandError(f'Файл не найден: {path}')
+            formats[kind] = options['format'] or importing.detect_format(path)
+            if formats[kind] is None:
+                raise CommandError(
+                    f'Не удалось определить формат {path}, укажите --format'
+                )
+        started = time.perf_counter()
+
+        def progress(kind, position):
+            self.stdout.write(
+                f'{kind}: {position} ({time.perf_counter() - started:.1f} с)'
+            )
+
+        importer = importing.Importer(options['create_users'])
+        for kind, path in files:
+            checkpoint = importing.Checkpoint(f'{path}.checkpoint')
+            if options['restart']:
+                checkpoint.position = 0
+                checkpoint.post_ranges = []
+            elif checkpoint.position:
+                self.stdout.write(
+                    f'{kind}: продолжаем с записи {checkpoint.position}'
+                )
+            importing.import_file(
+                importer, kind, path, formats[kind],
+                batch_size=options['batch_size'],
+                checkpoint=checkpoint,
+                progress=progress
+            )
+        self.stdout.write('finalize...')
+        importing.finish(importer.post_ranges)
+        skipped = ', '.join(
+            f'{reason}: {count}'
+            for reason, count in sorted(importer.skipped.items())
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.1f} с, записано: '
+            + ', '.join(
+                f'{kind} {importer.imported[kind]}' for kind, _ in files
+            )
+            + (f'; пропущено ({skipped})' if skipped else '')
+        ))
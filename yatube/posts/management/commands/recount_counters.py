@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import recount_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, подписок и комментариев.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recount_counters()
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Время рендеринга страниц лент без кэша шаблонов, с кэширующим '
+        'загрузчиком и с подстановкой include (режим settings_prod).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Рендерингов на страницу и режим.')
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--mode',
+            action='append',
+            choices=sorted(benchmark.TEMPLATE_MODES),
+            help='Только этот режим (можно несколько раз).'
+        )
+        parser.add_argument('--json', action='store_true',
+                            help='Вывести результаты в JSON.')
+
+    def handle(self, *args, **options):
+        results = benchmark.render_feeds(
+            options['requests'], options['warmup'], options['mode']
+        )
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        baseline = next(iter(results.values()))
+        for mode, pages in results.items():
+            self.stdout.write(mode)
+            for template_name, result in pages.items():
+                speedup = (baseline[template_name]['p50_ms']
+                           / result['p50_ms'])
+                self.stdout.write(
+                    f'  {template_name:<24} p50 {result["p50_ms"]:>8} мс  '
+                    f'p95 {result["p95_ms"]:>8} мс  '
+                    f'×{speedup:.2f}'
+                )
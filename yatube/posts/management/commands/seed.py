@@ -0,0 +1,111 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу сгенерированными пользователями, группами, постами, '
+        'комментариями и подписками (bulk_create пачками, в нескольких '
+        'процессах). Картинки-заглушки можно затем обработать командой '
+        'generate_thumbnails.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            choices=sorted(seeding.SCALES),
+            default='small',
+            help='Готовый размер набора; отдельные числа можно переопределить.'
+        )
+        parser.add_argument('--users', type=int)
+        parser.add_argument('--groups', type=int)
+        parser.add_argument('--posts', type=int)
+        parser.add_argument('--comments', type=int)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            help='Среднее число подписок на пользователя.'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора: при том же зерне и числе процессов '
+                 'данные повторяются.'
+        )
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=1.1,
+            help='Показатель закона Ципфа для авторов, групп, комментариев '
+                 'и подписок; чем больше, тем сильнее перекос.'
+        )
+        parser.add_argument('--group-share', type=float, default=0.7,
+                            help='Доля постов в группах.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней распределить посты.')
+        parser.add_argument('--images', type=int, default=0,
+                            help='Сколько картинок-заглушек создать.')
+        parser.add_argument('--image-share', type=float, default=0.3,
+                            help='Доля постов с картинкой.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Число процессов для постов, комментариев и подписок. '
+                 'При 1 всё выполняется в одной транзакции.'
+        )
+        parser.add_argument(
+            '--search-index',
+            action='store_true',
+            help='Пересобрать поисковый индекс.'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers должно быть не меньше 1')
+        for share in ('group_share', 'image_share'):
+            if not 0 <= options[share] <= 1:
+                raise CommandError(
+                    f'--{share.replace("_", "-")}: доля должна быть от 0 до 1'
+                )
+        counts = {
+            name: value if options[name] is None else options[name]
+            for name, value in seeding.SCALES[options['scale']].items()
+        }
+        started = time.perf_counter()
+
+        def progress(stage):
+            self.stdout.write(
+                f'{stage}... ({time.perf_counter() - started:.1f} с)'
+            )
+
+        def seed():
+            posts = seeding.seed_database(
+                **counts,
+                seed=options['seed'],
+                alpha=options['alpha'],
+                group_share=options['group_share'],
+                days=options['days'],
+                images=options['images'],
+                image_share=options['image_share'],
+                workers=options['workers'],
+                progress=progress
+            )
+            progress('finalize')
+            seeding.finalize(options['search_index'])
+            return posts
+
+        if options['workers'] == 1:
+            with transaction.atomic():
+                posts = seed()
+        else:
+            posts = seed()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.1f} с, '
+            f'постов в базе: {posts}'
+        ))
@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_timelines(apps, schema_editor):
+    # Один INSERT ... SELECT вместо цикла по подпискам. DISTINCT: до 0020
+    # подписки могут повторяться.
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    quote = schema_editor.connection.ops.quote_name
+    schema_editor.execute(
+        f'INSERT INTO {quote(TimelineEntry._meta.db_table)} '
+        f'({quote("user_id")}, {quote("post_id")}) '
+        f'SELECT DISTINCT follow.{quote("user_id")}, post.{quote("id")} '
+        f'FROM {quote(Follow._meta.db_table)} follow '
+        f'INNER JOIN {quote(Post._meta.db_table)} post '
+        f'ON post.{quote("author_id")} = follow.{quote("author_id")}'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0016_auto_20211205_2028'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+from collections import Counter
+
+from posts.stemmer import stem
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def tokenize(text):
+    return [stem(word)[:64] for word in re.findall(r'\w+', text.lower())]
+
+
+def create_index(apps, schema_editor):
+    """Создаёт таблицу FTS5 (если база — SQLite с FTS5) и индексирует
+    существующие посты."""
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    fts = schema_editor.connection.vendor == 'sqlite'
+    if fts:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            fts = ('ENABLE_FTS5',) in cursor.fetchall()
+    if fts:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} '
+            f"USING fts5(stems, tokenize = 'unicode61')"
+        )
+    for post in Post.objects.all().iterator():
+        if fts:
+            schema_editor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, stems) VALUES (%s, %s)',
+                [post.pk, ' '.join(tokenize(post.text))]
+            )
+        else:
+            SearchTerm.objects.bulk_create(
+                SearchTerm(term=term, post_id=post.pk, weight=weight)
+                for term, weight in Counter(tokenize(post.text)).items()
+            )
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(db_index=True, max_length=64, verbose_name='Основа слова')),
+                ('weight', models.PositiveIntegerField(verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Поисковый терм',
+                'verbose_name_plural': 'Поисковые термы',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
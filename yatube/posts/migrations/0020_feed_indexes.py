@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:36
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Profile = apps.get_model('posts', 'Profile')
+    duplicates = list(Follow.objects.values('user', 'author').annotate(
+        first=Min('id'),
+        total=Count('id'),
+    ).filter(total__gt=1))
+    users = set()
+    for duplicate in duplicates:
+        Follow.objects.filter(
+            user=duplicate['user'],
+            author=duplicate['author'],
+        ).exclude(id=duplicate['first']).delete()
+        users.update((duplicate['user'], duplicate['author']))
+    for profile in Profile.objects.filter(user__in=users):
+        profile.followers_count = Follow.objects.filter(
+            author=profile.user_id
+        ).count()
+        profile.following_count = Follow.objects.filter(
+            user=profile.user_id
+        ).count()
+        profile.save(update_fields=('followers_count', 'following_count'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date'], name='post_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date'], name='post_group_pub_date_idx'),
+        ),
+        migrations.RunPython(
+            remove_duplicate_follows, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
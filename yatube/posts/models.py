@@ -5,6 +5,35 @@ from django.db.models.fields.related import ForeignKey
 User = get_user_model()
 
 
+class Profile(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='profile',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписок'
+    )
+
+    class Meta:
+        verbose_name = 'Профиль'
+        verbose_name_plural = 'Профили'
+
+    def __str__(self) -> str:
+        return str(self.user)
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200, verbose_name='Заголовок')
     slug = models.SlugField(
@@ -19,6 +48,24 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для лент: автор и группа одним JOIN, только поля,
+        которые выводит шаблон posts/includes/post.html."""
+        return self.select_related('author', 'group').only(
+            'text',
+            'pub_date',
+            'updated_at',
+            'image',
+            'image_variants',
+            'author__username',
+            'author__first_name',
+            'author__last_name',
+            'group__slug',
+            'group__title',
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст',
@@ -28,6 +75,10 @@ class Post(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -44,11 +95,41 @@ class Post(models.Model):
         help_text='Выберите группу'
     )
     image = models.ImageField('Картинка', upload_to='posts/', blank=True)
+    # JSON {формат: [[ширина, имя файла], ...]}; заполняет posts.images.
+    image_variants = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Варианты картинки'
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # -id в конце каждого индекса совпадает с сортировкой лент
+        # ('-pub_date', '-id'), и страница читается без сортировки.
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_id_idx'
+            ),
+        )
 
     def __str__(self) -> str:
         return self.text[:15]
@@ -80,6 +161,12 @@ class Comment(models.Model):
         ordering = ('created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(
+                fields=('post', 'created'),
+                name='comment_post_created_idx'
+            ),
+        )
 
     def __str__(self) -> str:
         return self.author.username + ' : ' + self.text[:20]
@@ -102,6 +189,81 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_follow'
+            ),
+        )
 
     def __str__(self) -> str:
         return self.user.username + ' -> ' + self.author.username
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: пост, разосланный подписчику."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    # Копия post.pub_date: лента читается по индексу без JOIN с постами.
+    pub_date = models.DateTimeField(verbose_name='Дата публикации поста')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_timeline_entry'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='timeline_user_pub_date_idx'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.user_id} <- {self.post_id}'
+
+
+class SearchTerm(models.Model):
+    """Запись инвертированного индекса: основа слова и число её вхождений
+    в текст поста."""
+    TERM_MAX_LENGTH = 64
+
+    term = models.CharField(
+        max_length=TERM_MAX_LENGTH,
+        db_index=True,
+        verbose_name='Основа слова'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Пост'
+    )
+    weight = models.PositiveIntegerField(verbose_name='Число вхождений')
+
+    class Meta:
+        verbose_name = 'Поисковый терм'
+        verbose_name_plural = 'Поисковые термы'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('term', 'post'),
+                name='unique_search_term'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.term} -> {self.post_id}'
@@ -0,0 +1,173 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def after(ordering, position):
+    """Условие «запись идёт после position» для заданной сортировки."""
+    condition = Q()
+    equal = Q()
+    for name, value in zip(ordering, position):
+        field = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{field}__{lookup}': value})
+        equal &= Q(**{field: value})
+    return condition
+
+
+class CursorPage:
+    """Страница ленты, полученная по курсору, а не по номеру."""
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __contains__(self, item):
+        return item in self.object_list
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по набору полей сортировки.
+
+    Вместо ``COUNT(*)`` и ``OFFSET`` страница выбирается условием
+    «после последней показанной записи», поэтому стоимость запроса
+    не зависит от глубины страницы. Последнее поле сортировки должно
+    быть уникальным (обычно ``id``).
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = tuple(name.lstrip('-') for name in self.ordering)
+
+    def encode_cursor(self, direction, item):
+        return self._encode(direction, [
+            self._field(name).value_to_string(item)
+            if not isinstance(item, dict) else str(item[name])
+            for name in self.fields
+        ])
+
+    @staticmethod
+    def _encode(direction, values):
+        return base64.urlsafe_b64encode(
+            json.dumps([direction] + values).encode()
+        ).decode().rstrip('=')
+
+    def normalize_cursor(self, cursor):
+        """Курсор в каноническом виде или None, если он пуст или неверен
+        (get_page тогда отдаёт первую страницу). Разные записи одной
+        позиции дают один и тот же курсор."""
+        if not cursor:
+            return None
+        try:
+            direction, position = self.decode_cursor(cursor)
+        except InvalidCursor:
+            return None
+        return self._encode(direction, [str(value) for value in position])
+
+    def decode_cursor(self, cursor):
+        """Направление и позиция из курсора. Подделанный или испорченный
+        курсор (в том числе с null и вложенными значениями) даёт
+        InvalidCursor, а не ошибку в запросе."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, *values = json.loads(
+                base64.urlsafe_b64decode(padded.encode())
+            )
+            if direction not in (NEXT, PREVIOUS):
+                raise InvalidCursor(cursor)
+            if len(values) != len(self.fields):
+                raise InvalidCursor(cursor)
+            if not all(isinstance(value, str) for value in values):
+                raise InvalidCursor(cursor)
+            position = [
+                self._field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (ValueError, TypeError, binascii.Error,
+                ValidationError) as error:
+            raise InvalidCursor(cursor) from error
+        if any(value is None for value in position):
+            raise InvalidCursor(cursor)
+        return direction, position
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу по курсору; неверный курсор даёт первую."""
+        if cursor:
+            try:
+                direction, position = self.decode_cursor(cursor)
+            except InvalidCursor:
+                direction, position = NEXT, None
+        else:
+            direction, position = NEXT, None
+        ordering = self.ordering
+        if direction == PREVIOUS:
+            ordering = tuple(self._reverse(name) for name in ordering)
+        items = self._select(ordering, position, self.per_page + 1)
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if direction == PREVIOUS:
+            items.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+        return CursorPage(
+            items,
+            self,
+            self.encode_cursor(NEXT, items[-1])
+            if has_next and items else None,
+            self.encode_cursor(PREVIOUS, items[0])
+            if has_previous and items else None,
+        )
+
+    def _select(self, ordering, position, limit):
+        """До limit записей после position. object_list может выбирать
+        их сам методом select_page (см. timeline.FollowFeed)."""
+        if hasattr(self.object_list, 'select_page'):
+            return self.object_list.select_page(ordering, position, limit)
+        items = self.object_list.order_by(*ordering)
+        if position is not None:
+            items = items.filter(after(ordering, position))
+        return list(items[:limit])
+
+    def _field(self, name):
+        return self.object_list.model._meta.get_field(name)
+
+    @staticmethod
+    def _reverse(name):
+        return name[1:] if name.startswith('-') else '-' + name
@@ -0,0 +1,147 @@
+import math
+import re
+from collections import Counter
+
+from django.db import connection
+from django.db.models import (Case, Count, ExpressionWrapper, F, FloatField,
+                              Sum, Value, When)
+
+from .models import Post, SearchTerm
+from .settings import SEARCH_MAX_RESULTS, SEARCH_MAX_TERMS
+from .stemmer import stem
+
+FTS_TABLE = 'posts_post_fts'
+FTS_AVAILABLE = {}
+WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return [stem(word) for word in WORD.findall(text.lower())]
+
+
+class InvertedIndex:
+    """Инвертированный индекс в таблице SearchTerm: терм -> посты с
+    числом вхождений. Ранжирование по TF-IDF."""
+
+    def index(self, post):
+        SearchTerm.objects.filter(post_id=post.pk).delete()
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term, post_id=post.pk, weight=weight)
+            for term, weight in Counter(
+                term[:SearchTerm.TERM_MAX_LENGTH]
+                for term in tokenize(post.text)
+            ).items()
+        )
+
+    def remove(self, post_id):
+        SearchTerm.objects.filter(post_id=post_id).delete()
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def search(self, terms, limit):
+        terms = [term[:SearchTerm.TERM_MAX_LENGTH] for term in terms]
+        frequencies = dict(
+            SearchTerm.objects.filter(term__in=terms).values_list(
+                'term'
+            ).annotate(Count('post'))
+        )
+        if len(frequencies) < len(terms):
+            return []
+        total = Post.objects.count()
+        idf = {
+            term: math.log(1 + total / frequency)
+            for term, frequency in frequencies.items()
+        }
+        return list(SearchTerm.objects.filter(term__in=terms).values(
+            'post'
+        ).annotate(
+            matched=Count('term'),
+            rank=Sum(Case(
+                *(When(term=term, then=ExpressionWrapper(
+                    F('weight') * Value(weight),
+                    output_field=FloatField()
+                )) for term, weight in idf.items()),
+                output_field=FloatField()
+            ))
+        ).filter(matched=len(terms)).order_by(
+            '-rank', '-post'
+        ).values_list('post', flat=True)[:limit])
+
+
+class Fts5Index:
+    """Индекс SQLite FTS5 по основам слов; ранжирование по BM25."""
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, stems) VALUES (%s, %s)',
+                [post.pk, ' '.join(tokenize(post.text))]
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, terms, limit):
+        query = ' '.join('"{}"'.format(term.replace('"', '""'))
+                         for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}), rowid DESC LIMIT %s',
+                [query, limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+def has_fts():
+    key = (connection.alias, connection.settings_dict['NAME'])
+    if key not in FTS_AVAILABLE:
+        FTS_AVAILABLE[key] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return FTS_AVAILABLE[key]
+
+
+def get_index():
+    return Fts5Index() if has_fts() else InvertedIndex()
+
+
+def search_posts(query, limit=SEARCH_MAX_RESULTS):
+    """Идентификаторы постов, подходящих под запрос, по убыванию
+    релевантности. Пост должен содержать все слова запроса."""
+    terms = list(dict.fromkeys(tokenize(query)))[:SEARCH_MAX_TERMS]
+    if not terms:
+        return []
+    return get_index().search(terms, limit)
+
+
+def index_post(post):
+    get_index().index(post)
+
+
+def remove_post(post_id):
+    get_index().remove(post_id)
+
+
+def index_posts(posts):
+    """Индексирует посты queryset, например записанные bulk_create."""
+    search_index = get_index()
+    for post in posts.only('text').iterator():
+        search_index.index(post)
+
+
+def rebuild_index():
+    get_index().clear()
+    index_posts(Post.objects.all())
@@ -0,0 +1,350 @@
+"""Генерация больших наборов данных для нагрузочных тестов.
+
+Строки создаются через bulk_create пачками, поэтому сигналы моделей
+не срабатывают: счётчики, ленты подписок и кэш лент восстанавливаются
+в finalize() одним проходом. Размер пачки BATCH_SIZE — сколько объектов
+держать в памяти; на INSERT их делит сам bulk_create с учётом
+ограничений СУБД.
+
+Посты, комментарии и подписки можно генерировать в нескольких процессах:
+каждый получает свою часть и свой генератор случайных чисел, выведенный
+из общего зерна, поэтому при том же зерне и числе процессов результат
+повторяется.
+"""
+import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from . import feed_cache
+from .counters import recount_counters
+from .models import Comment, Follow, Group, Post, User
+from .search import rebuild_index
+from .settings import IMAGE_BASE_SIZE
+from .timeline import rebuild_timelines
+
+BATCH_SIZE = 5000
+USERNAME = 'seed_{}'
+GROUP_SLUG = 'seed-group-{}'
+PLACEHOLDER = 'posts/seed/placeholder_{}.jpg'
+WORDS = (
+    'лента', 'пост', 'автор', 'группа', 'подписка', 'комментарий',
+    'кошка', 'собака', 'город', 'лето', 'зима', 'книга', 'фильм',
+    'музыка', 'код', 'запрос', 'база', 'кэш', 'индекс', 'страница',
+    'сегодня', 'вчера', 'новый', 'старый', 'быстрый', 'медленный',
+)
+SCALES = {
+    'small': {
+        'users': 1000, 'groups': 50, 'posts': 20000,
+        'comments': 50000, 'follows': 20,
+    },
+    'medium': {
+        'users': 10000, 'groups': 500, 'posts': 200000,
+        'comments': 500000, 'follows': 30,
+    },
+    'large': {
+        'users': 100000, 'groups': 5000, 'posts': 2000000,
+        'comments': 5000000, 'follows': 50,
+    },
+}
+
+
+def power_law_weights(count, alpha):
+    """Накопленные веса Ципфа для random.choices(cum_weights=...):
+    i-й элемент выпадает в (i + 1) ** alpha раз реже первого."""
+    return list(accumulate(1 / (rank + 1) ** alpha for rank in range(count)))
+
+
+def make_rng(seed, stage, part=0):
+    """Независимый генератор для этапа и части: результат не зависит от
+    того, в каком порядке выполнялись части."""
+    return random.Random(f'{seed}:{stage}:{part}')
+
+
+def split(count, parts):
+    """Делит count на parts частей, отличающихся не больше чем на 1."""
+    return [count // parts + (part < count % parts) for part in range(parts)]
+
+
+def random_text(rng, words=(5, 40)):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(*words))).capitalize()
+
+
+@contextmanager
+def explicit_dates():
+    """Отключает auto_now_add и auto_now у дат постов и комментариев,
+    чтобы сгенерированные даты не заменялись текущим временем."""
+    fields = (
+        (Post._meta.get_field('pub_date'), 'auto_now_add'),
+        (Post._meta.get_field('updated_at'), 'auto_now'),
+        (Comment._meta.get_field('created'), 'auto_now_add'),
+    )
+    for field, option in fields:
+        setattr(field, option, False)
+    try:
+        yield
+    finally:
+        for field, option in fields:
+            setattr(field, option, True)
+
+
+def _batches(count, batch_size):
+    for start in range(0, count, batch_size):
+        yield range(start, min(start + batch_size, count))
+
+
+def create_users(count, start=0, batch_size=BATCH_SIZE):
+    password = make_password(None)
+    for batch in _batches(count, batch_size):
+        User.objects.bulk_create(
+            (User(username=USERNAME.format(start + index),
+                  password=password)
+             for index in batch),
+            ignore_conflicts=True
+        )
+
+
+def create_groups(count, rng, start=0):
+    Group.objects.bulk_create(
+        (Group(
+            title=f'Группа {start + index}',
+            slug=GROUP_SLUG.format(start + index),
+            description=random_text(rng)
+        ) for index in range(count)),
+        ignore_conflicts=True
+    )
+
+
+def create_placeholder_images(count, rng):
+    """Картинки-заглушки (градиент со случайными фигурами) в хранилище
+    медиафайлов; уже существующие не перезаписываются. Возвращает имена
+    файлов для поля Post.image."""
+    names = []
+    width, height = IMAGE_BASE_SIZE
+    for index in range(count):
+        name = PLACEHOLDER.format(index)
+        colors = [tuple(rng.randrange(256) for _ in range(3))
+                  for _ in range(2)]
+        shapes = [
+            (sorted(rng.randrange(width) for _ in range(2)),
+             sorted(rng.randrange(height) for _ in range(2)),
+             tuple(rng.randrange(256) for _ in range(3)))
+            for _ in range(rng.randint(1, 5))
+        ]
+        if not default_storage.exists(name):
+            image = Image.linear_gradient('L').resize((width, height))
+            image = Image.composite(
+                Image.new('RGB', (width, height), colors[0]),
+                Image.new('RGB', (width, height), colors[1]),
+                image
+            )
+            draw = ImageDraw.Draw(image)
+            for (left, right), (top, bottom), color in shapes:
+                draw.ellipse((left, top, right, bottom), fill=color)
+            buffer = BytesIO()
+            image.save(buffer, 'JPEG', quality=75)
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        names.append(name)
+    return names
+
+
+def create_posts(count, author_ids, group_ids, rng, alpha=1.1,
+                 group_share=0.7, days=365, images=(), image_share=0.3,
+                 batch_size=BATCH_SIZE):
+    """Посты с распределением по авторам и группам по закону Ципфа
+    и датами за последние days дней. Доля image_share постов получает
+    случайную картинку из images."""
+    author_weights = power_law_weights(len(author_ids), alpha)
+    group_weights = power_law_weights(len(group_ids), alpha)
+    now = timezone.now()
+    with explicit_dates():
+        for batch in _batches(count, batch_size):
+            authors = rng.choices(
+                author_ids, cum_weights=author_weights, k=len(batch)
+            )
+            groups = rng.choices(
+                group_ids, cum_weights=group_weights, k=len(batch)
+            ) if group_ids else [None] * len(batch)
+            posts = []
+            for author_id, group_id in zip(authors, groups):
+                pub_date = now - timedelta(
+                    seconds=rng.randint(0, days * 24 * 60 * 60)
+                )
+                posts.append(Post(
+                    text=random_text(rng),
+                    author_id=author_id,
+                    group_id=group_id if rng.random() < group_share
+                    else None,
+                    pub_date=pub_date,
+                    updated_at=pub_date,
+                    image=rng.choice(images)
+                    if images and rng.random() < image_share else '',
+                ))
+            Post.objects.bulk_create(posts)
+
+
+def create_comments(count, post_ids, user_ids, rng, alpha=1.1, days=30,
+                    batch_size=BATCH_SIZE):
+    """Комментарии: несколько «вирусных» постов собирают большую часть."""
+    post_weights = power_law_weights(len(post_ids), alpha)
+    now = timezone.now()
+    with explicit_dates():
+        for batch in _batches(count, batch_size):
+            Comment.objects.bulk_create(
+                Comment(
+                    post_id=post_id,
+                    author_id=rng.choice(user_ids),
+                    text=random_text(rng, (1, 15)),
+                    created=now - timedelta(
+                        seconds=rng.randint(0, days * 24 * 60 * 60)
+                    ),
+                )
+                for post_id in rng.choices(
+                    post_ids, cum_weights=post_weights, k=len(batch)
+                )
+            )
+
+
+def create_follows(per_user, user_ids, author_ids, rng, alpha=1.1,
+                   batch_size=BATCH_SIZE):
+    """Граф подписок со степенным распределением подписчиков: на первых
+    авторов подписаны почти все, на хвост — единицы."""
+    author_weights = power_law_weights(len(author_ids), alpha)
+    follows = []
+    for user_id in user_ids:
+        authors = set(rng.choices(
+            author_ids,
+            cum_weights=author_weights,
+            k=rng.randint(0, 2 * per_user)
+        ))
+        authors.discard(user_id)
+        follows.extend(
+            Follow(user_id=user_id, author_id=author_id)
+            for author_id in authors
+        )
+        if len(follows) >= batch_size:
+            Follow.objects.bulk_create(follows, ignore_conflicts=True)
+            follows = []
+    Follow.objects.bulk_create(follows, ignore_conflicts=True)
+
+
+def _seed_user_ids():
+    return list(User.objects.filter(
+        username__startswith=USERNAME.format('')
+    ).order_by('pk').values_list('pk', flat=True))
+
+
+def _seed_group_ids():
+    return list(Group.objects.filter(
+        slug__startswith=GROUP_SLUG.format('')
+    ).order_by('pk').values_list('pk', flat=True))
+
+
+def create_part(stage, part, parts, count, seed=0, alpha=1.1, **options):
+    """Часть part из parts этапа posts, comments или follows. Для follows
+    count — среднее число подписок на пользователя, пользователи делятся
+    между частями; для остальных этапов делится само count."""
+    rng = make_rng(seed, stage, part)
+    user_ids = _seed_user_ids()
+    if stage == 'posts':
+        create_posts(
+            split(count, parts)[part],
+            make_rng(seed, 'authors').sample(user_ids, len(user_ids)),
+            _seed_group_ids(),
+            rng,
+            alpha,
+            **options
+        )
+    elif stage == 'comments':
+        create_comments(
+            split(count, parts)[part],
+            list(Post.objects.order_by('-pk').values_list('pk', flat=True)),
+            user_ids,
+            rng,
+            alpha,
+            **options
+        )
+    elif stage == 'follows':
+        # Порядок популярности у подписок свой: иначе у самых
+        # подписываемых авторов оказываются и почти все посты, и ленты
+        # разрастаются квадратично.
+        create_follows(
+            count,
+            user_ids[part::parts],
+            make_rng(seed, 'followed').sample(user_ids, len(user_ids)),
+            rng,
+            alpha
+        )
+    else:
+        raise ValueError(f'Неизвестный этап: {stage}')
+
+
+def _create_part_in_process(arguments):
+    stage, part, parts, count, options = arguments
+    try:
+        create_part(stage, part, parts, count, **options)
+    finally:
+        connections.close_all()
+
+
+def run_stage(stage, count, workers=1, **options):
+    """Выполняет этап в workers процессах; при workers=1 — в текущем
+    процессе и текущей транзакции."""
+    if workers == 1:
+        create_part(stage, 0, 1, count, **options)
+        return
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_create_part_in_process, [
+            (stage, part, workers, count, options)
+            for part in range(workers)
+        ]))
+
+
+def seed_database(users, groups, posts, comments, follows, seed=0,
+                  alpha=1.1, group_share=0.7, days=365, images=0,
+                  image_share=0.3, workers=1, progress=None):
+    """Заполняет базу; возвращает число постов.
+
+    Пользователи и группы создаются в текущем процессе (их немного),
+    остальное — в workers процессах. progress(stage) вызывается перед
+    каждым этапом.
+    """
+    progress = progress or (lambda stage: None)
+    progress('users')
+    create_users(users)
+    progress('groups')
+    create_groups(groups, make_rng(seed, 'groups'))
+    if images:
+        progress('images')
+        images = create_placeholder_images(images, make_rng(seed, 'images'))
+    stages = (
+        ('posts', posts, {
+            'group_share': group_share, 'days': days,
+            'images': images or (), 'image_share': image_share,
+        }),
+        ('comments', comments, {}),
+        ('follows', follows, {}),
+    )
+    for stage, count, options in stages:
+        progress(stage)
+        run_stage(stage, count, workers, seed=seed, alpha=alpha, **options)
+    return Post.objects.count()
+
+
+def finalize(search_index=False):
+    """Восстанавливает то, что обычно поддерживают сигналы."""
+    recount_counters()
+    rebuild_timelines()
+    if search_index:
+        rebuild_index()
+    feed_cache.bump(feed_cache.ALL_FEEDS)
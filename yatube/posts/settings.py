@@ -1,2 +1,27 @@
 PAGINATOR_NUM_PAGES = 10
-CACHE_TIME = 20
+COMMENTS_PER_PAGE = 50
+COMMENTS_MAX_PER_PAGE = 200
+FEED_CACHE_TIME = 60 * 60 * 6
+POST_FRAGMENT_CACHE_TIME = 60 * 60 * 24
+CURSOR_PAGINATION = False
+FANOUT_FOLLOWERS_LIMIT = 1000
+FANOUT_BATCH_SIZE = 1000
+FOLLOW_BULK_MAX_AUTHORS = 100
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+EXPORT_CHUNK_SIZE = 2000
+IMPORT_BATCH_SIZE = 2000
+SEARCH_MAX_RESULTS = 1000
+SEARCH_MAX_TERMS = 10
+IMAGE_BASE_SIZE = (960, 339)
+IMAGE_VARIANT_WIDTHS = (480, 960, 1440)
+IMAGE_VARIANT_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANTS_DIR = 'posts/variants'
+THUMBNAIL_WORKERS = 2
+IMAGE_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+IMAGE_UPLOAD_MAX_PIXELS = 40 * 1000 * 1000
+IMAGE_UPLOAD_QUALITY = 85
+IMAGE_UPLOAD_WORKERS = 2
+THUMBNAIL_PLACEHOLDER = 'img/placeholder.svg'
+BENCHMARK_CACHE = 'benchmark'
@@ -0,0 +1,94 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, feed_cache, images, search, timeline
+from .models import Comment, Follow, Group, Post, Profile, User
+
+
+AUTHOR_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._old_names = User.objects.filter(
+            pk=instance.pk
+        ).values_list(*AUTHOR_NAME_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        Profile.objects.create(user=instance)
+        return
+    names = tuple(getattr(instance, field) for field in AUTHOR_NAME_FIELDS)
+    if getattr(instance, '_old_names', names) != names:
+        feed_cache.bump_author(instance.pk)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._old_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change_posts_count(instance.author_id, 1)
+        timeline.fan_out_post(instance)
+    search.index_post(instance)
+    if instance.image:
+        images.schedule_on_commit(instance)
+    feed_cache.bump_post(instance, getattr(instance, '_old_group_id', None))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_posts_count(instance.author_id, -1)
+    search.remove_post(instance.pk)
+    feed_cache.bump_post(instance)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        feed_cache.bump_group(instance.pk)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    feed_cache.bump_group(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_follow_counts(instance.user_id, instance.author_id, 1)
+        timeline.add_author(instance.user_id, instance.author_id)
+        feed_cache.bump(feed_cache.follow_feed(instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_follow_counts(instance.user_id, instance.author_id, -1)
+    timeline.remove_author(instance.user_id, instance.author_id)
+    timeline.backfill_authors([instance.author_id])
+    feed_cache.bump(feed_cache.follow_feed(instance.user_id))
@@ -0,0 +1,65 @@
+import re
+
+VOWELS = 'аеиоуыэюя'
+PERFECTIVE_GERUND = re.compile(
+    r'((?<=[ая])(в|вши|вшись)|(ив|ивши|ившись|ыв|ывши|ывшись))$'
+)
+REFLEXIVE = re.compile(r'(ся|сь)$')
+ADJECTIVE = (
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)'
+)
+PARTICIPLE = r'((?<=[ая])(ем|нн|вш|ющ|щ)|(ивш|ывш|ующ))'
+ADJECTIVAL = re.compile(f'{PARTICIPLE}?{ADJECTIVE}$')
+VERB = re.compile(
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)|'
+    r'(ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|'
+    r'ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+DERIVATIONAL = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'ейше?$')
+
+
+def _region(word, start=0):
+    """Начало области после первой согласной, идущей за гласной."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def stem(word):
+    """Стеммер Портера (Snowball) для русского языка."""
+    word = word.lower().replace('ё', 'е')
+    match = re.search(f'[{VOWELS}]', word)
+    if not match:
+        return word
+    head, rv = word[:match.end()], word[match.end():]
+    r2 = max(_region(word, _region(word)) - match.end(), 0)
+
+    rv, found = PERFECTIVE_GERUND.subn('', rv, count=1)
+    if not found:
+        rv = REFLEXIVE.sub('', rv, count=1)
+        rv, found = ADJECTIVAL.subn('', rv, count=1)
+        if not found:
+            rv, found = VERB.subn('', rv, count=1)
+            if not found:
+                rv = NOUN.sub('', rv, count=1)
+
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    derivational = DERIVATIONAL.search(rv)
+    if derivational and derivational.start() >= r2:
+        rv = rv[:derivational.start()]
+
+    rv, found = SUPERLATIVE.subn('', rv, count=1)
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif not found and rv.endswith('ь'):
+        rv = rv[:-1]
+    return head + rv
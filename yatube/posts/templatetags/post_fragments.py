@@ -0,0 +1,14 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..fragments import render_posts
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_list(context, posts):
+    """Посты ленты из кэша фрагментов, разделённые <hr>."""
+    return mark_safe('\n<hr>\n'.join(
+        render_posts(posts, context.get('is_group', False))
+    ))
@@ -0,0 +1,34 @@
+from django import template
+from django.templatetags.static import static
+
+from ..images import MIME_TYPES, get_variants, schedule_on_commit
+from ..settings import IMAGE_BASE_SIZE, THUMBNAIL_PLACEHOLDER
+
+register = template.Library()
+
+
+def _srcset(variants):
+    return ', '.join(f'{url} {width}w' for width, url in variants)
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post):
+    """Картинка поста в виде <picture>: современные форматы в <source>,
+    JPEG — в <img>. Пока варианты не готовы, выводится заглушка."""
+    width, height = IMAGE_BASE_SIZE
+    context = {'width': width, 'height': height}
+    variants = get_variants(post)
+    if not variants:
+        schedule_on_commit(post)
+        return {**context, 'src': static(THUMBNAIL_PLACEHOLDER)}
+    fallback = variants.pop('JPEG')
+    return {
+        **context,
+        'sources': [
+            {'type': MIME_TYPES[image_format], 'srcset': _srcset(sizes)}
+            for image_format, sizes in variants.items()
+        ],
+        'src': dict(fallback).get(width, fallback[-1][1]),
+        'srcset': _srcset(fallback),
+        'sizes': f'(max-width: {width}px) 100vw, {width}px',
+    }
@@ -0,0 +1,121 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+POSTS_URL = reverse('api:post_list')
+FOLLOW_URL = reverse('api:follow_feed')
+
+
+class ApiTest(TestCase):
+    """Тестирование JSON API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {index}',
+                author=cls.author,
+                group=cls.group if index % 2 else None
+            )
+            for index in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_post_list(self):
+        """Проверяем состав полей, порядок и то, что список постов
+        собирается одним запросом."""
+        with self.assertNumQueries(1):
+            data = self.client.get(POSTS_URL).json()
+        self.assertEqual(
+            [post['id'] for post in data['results']],
+            [post.pk for post in reversed(self.posts)]
+        )
+        post = data['results'][-1]
+        self.assertEqual(post['author'], 'author')
+        self.assertIsNone(post['group'])
+        self.assertIsNone(post['image'])
+        self.assertEqual(post['comments_count'], 1)
+        self.assertEqual(set(post), {
+            'id', 'text', 'pub_date', 'updated_at', 'author', 'group',
+            'image', 'comments_count',
+        })
+
+    def test_sparse_fields(self):
+        data = self.client.get(POSTS_URL, {'fields': 'text,id'}).json()
+        self.assertEqual(data['results'][0], {
+            'text': 'Пост 4', 'id': self.posts[4].pk
+        })
+        response = self.client.get(POSTS_URL, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_cursor_pagination(self):
+        """Проверяем, что по курсорам выдаются все посты без повторов."""
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2, 'fields': 'id'}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get(POSTS_URL, params).json()
+            seen.extend(post['id'] for post in data['results'])
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+
+    def test_related_resources(self):
+        urls = {
+            reverse('api:group_posts', kwargs={'slug': 'group'}): 2,
+            reverse('api:profile_posts', kwargs={'username': 'author'}): 5,
+            reverse('api:post_comments',
+                    kwargs={'post_id': self.posts[0].pk}): 1,
+            reverse('api:group_list'): 1,
+        }
+        for url, count in urls.items():
+            with self.subTest(url=url):
+                self.assertEqual(
+                    len(self.client.get(url).json()['results']), count
+                )
+        profile = self.client.get(reverse(
+            'api:profile_detail', kwargs={'username': 'author'}
+        )).json()
+        self.assertEqual(profile['first_name'], 'Лев')
+        self.assertEqual(profile['posts_count'], 5)
+        self.assertEqual(profile['followers_count'], 1)
+
+    def test_not_found(self):
+        urls = (
+            reverse('api:post_detail', kwargs={'post_id': 0}),
+            reverse('api:group_posts', kwargs={'slug': 'missing'}),
+            reverse('api:profile_posts', kwargs={'username': 'missing'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_follow_feed(self):
+        """Проверяем, что лента подписок доступна только после входа."""
+        self.assertEqual(self.client.get(FOLLOW_URL).status_code, 401)
+        data = self.reader_client.get(FOLLOW_URL).json()
+        self.assertEqual(len(data['results']), 5)
+
+    def test_read_only(self):
+        self.assertEqual(
+            self.reader_client.post(POSTS_URL).status_code, 405
+        )
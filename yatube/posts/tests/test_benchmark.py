@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from .. import seeding
+from ..models import Comment
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seeding.seed_database(
+            users=20, groups=3, posts=60, comments=100, follows=3, seed=1
+        )
+        seeding.finalize()
+
+    def run_benchmark(self, **options):
+        out = StringIO()
+        call_command(
+            'benchmark', requests=3, warmup=0, json=True, stdout=out,
+            stderr=StringIO(), **options
+        )
+        return json.loads(out.getvalue())
+
+    def test_benchmark_reports_scenarios(self):
+        """Команда выдаёт перцентили и число запросов по сценариям и
+        сохраняет их как эталон."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            results = self.run_benchmark(baseline=path, save_baseline=True)
+            self.assertTrue(os.path.exists(path))
+        self.assertIn('index', results)
+        for result in results.values():
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['max_queries'], 0)
+
+    def test_benchmark_detects_regression(self):
+        """Рост числа запросов относительно эталона — ошибка команды."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump({'index': {'p95_ms': 1000, 'max_queries': 0}}, file)
+            with self.assertRaisesMessage(CommandError, 'SQL-запросов'):
+                self.run_benchmark(baseline=path, scenario=['index'])
+
+    def test_benchmark_requires_baseline(self):
+        """Без эталона и без --save-baseline команда завершается ошибкой."""
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaisesMessage(CommandError, 'Нет эталона'):
+                self.run_benchmark(
+                    baseline=os.path.join(directory, 'baseline.json')
+                )
+
+    def test_benchmark_leaves_no_traces(self):
+        """Комментарии сценария add_comment откатываются, а --cold не
+        очищает кэш сайта."""
+        comments = Comment.objects.count()
+        cache.set('site-key', 'value')
+        with tempfile.TemporaryDirectory() as directory:
+            self.run_benchmark(
+                baseline=os.path.join(directory, 'baseline.json'),
+                save_baseline=True,
+                cold=True,
+                scenario=['add_comment', 'index']
+            )
+        self.assertEqual(Comment.objects.count(), comments)
+        self.assertEqual(cache.get('site-key'), 'value')
@@ -0,0 +1,137 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import export
+from ..models import Comment, Follow, Group, Post, User
+
+POSTS_URL = reverse('posts:export_data', kwargs={'kind': 'posts'})
+
+
+def read(response):
+    return b''.join(response.streaming_content)
+
+
+class ExportTest(TestCase):
+    """Тестирование потоковой выгрузки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост, "{index}"\nвторая строка',
+                author=cls.author,
+                group=cls.group if index % 2 else None
+            )
+            for index in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def test_batches(self):
+        """Проверяем, что пачки идут по id без пропусков и повторов."""
+        batches = list(export.iter_batches('posts', chunk_size=2))
+        self.assertEqual([len(rows) for rows in batches], [2, 2, 1])
+        self.assertEqual(
+            [row[0] for rows in batches for row in rows],
+            [post.pk for post in self.posts]
+        )
+
+    def test_ndjson(self):
+        lines = b''.join(
+            export.stream('posts', chunk_size=2)
+        ).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        post = json.loads(lines[1])
+        self.assertEqual(post['id'], self.posts[1].pk)
+        self.assertEqual(post['text'], self.posts[1].text)
+        self.assertEqual(post['author'], 'author')
+        self.assertEqual(post['group'], 'group')
+        self.assertEqual(
+            post['pub_date'], self.posts[1].pub_date.isoformat()
+        )
+
+    def test_csv(self):
+        content = b''.join(export.stream('comments', 'csv')).decode()
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], list(export.EXPORTS['comments'][1]))
+        self.assertEqual(rows[1][1:4], [
+            str(self.posts[0].pk), 'reader', 'Комментарий'
+        ])
+        posts = list(csv.DictReader(io.StringIO(
+            b''.join(export.stream('posts', 'csv', chunk_size=2)).decode()
+        )))
+        self.assertEqual(
+            [post['text'] for post in posts],
+            [post.text for post in self.posts]
+        )
+
+    def test_endpoint(self):
+        response = self.admin_client.get(POSTS_URL, {
+            'format': 'csv', 'gzip': '1'
+        })
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('posts.csv.gz', response['Content-Disposition'])
+        self.assertEqual(
+            gzip.decompress(read(response)),
+            b''.join(export.stream('posts', 'csv'))
+        )
+        response = self.admin_client.get(
+            reverse('posts:export_data', kwargs={'kind': 'follows'})
+        )
+        self.assertEqual(
+            json.loads(read(response)),
+            {'id': Follow.objects.get().pk,
+             'user': 'reader', 'author': 'author'}
+        )
+
+    def test_endpoint_errors(self):
+        """Проверяем, что выгрузка доступна только персоналу, а неизвестные
+        выгрузки и форматы дают 404."""
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(POSTS_URL)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('admin:login'), response.url)
+        urls = (
+            reverse('posts:export_data', kwargs={'kind': 'users'}),
+            f'{POSTS_URL}?format=xml',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.admin_client.get(url).status_code, 404
+                )
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.ndjson.gz')
+            call_command(
+                'export_posts', gzip=True, output=path, chunk_size=2
+            )
+            with gzip.open(path) as file:
+                self.assertEqual(
+                    file.read(), b''.join(export.stream('posts'))
+                )
+        stdout = io.StringIO()
+        call_command('export_posts', kind='follows', stdout=stdout)
+        self.assertEqual(json.loads(stdout.getvalue())['user'], 'reader')
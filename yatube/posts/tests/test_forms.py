@@ -1,14 +1,20 @@
+import re
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from ..forms import PostForm
 from ..models import Comment, Group, Post, User
+from ..uploads import ImageUploadHandler
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 USERNAME = 'MrNobody'
@@ -24,7 +30,20 @@ SMALL_GIF = (
     b'\x0A\x00\x3B'
 )
 
+CONTENT_ADDRESSED_NAME = re.compile(r'posts/[0-9a-f]{64}\.jpg')
 
+
+def make_jpeg(size=(20, 10)):
+    exif = Image.Exif()
+    exif[0x010F] = 'Тестовая камера'
+    buffer = BytesIO()
+    Image.new('RGB', size, 'blue').save(
+        buffer, 'JPEG', exif=exif.tobytes()
+    )
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostFormsTest(TestCase):
     """Тестируем формы."""
     @classmethod
@@ -216,3 +235,107 @@ class PostFormsTest(TestCase):
         self.assertEqual(comment.author, self.user)
         self.assertEqual(comment.post, self.post)
         self.assertEqual(comment.text, form_data['text'])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTest(TestCase):
+    """Тестируем потоковую загрузку картинок."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.authorized_user = Client()
+        cls.authorized_user.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, content, client=None):
+        return (client or self.authorized_user).post(POST_CREATE_URL, {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile(
+                name='photo.jpg',
+                content=content,
+                content_type='image/jpeg'
+            )
+        })
+
+    def test_identical_images_stored_once(self):
+        """Проверяем, что одинаковые картинки сохраняются под одним
+        именем — хешем содержимого."""
+        content = make_jpeg()
+        self.create_post(content)
+        self.create_post(content)
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertRegex(names.pop(), CONTENT_ADDRESSED_NAME)
+
+    def test_metadata_stripped(self):
+        """Проверяем, что при перекодировании удаляются метаданные."""
+        self.create_post(make_jpeg())
+        with default_storage.open(Post.objects.get().image.name) as file:
+            self.assertNotIn('exif', Image.open(file).info)
+
+    def test_color_profile(self):
+        """Проверяем, что профиль RGB-картинки сохраняется, а профиль
+        CMYK и оттенков серого не попадает в RGB-файл."""
+        cases = (('RGB', True), ('CMYK', False), ('L', False))
+        for mode, kept in cases:
+            with self.subTest(mode=mode):
+                buffer = BytesIO()
+                Image.new(mode, (20, 10)).save(
+                    buffer, 'JPEG', icc_profile=f'{mode} profile'.encode()
+                )
+                self.create_post(buffer.getvalue())
+                post = Post.objects.latest('pk')
+                with default_storage.open(post.image.name) as file:
+                    image = Image.open(file)
+                    self.assertEqual(image.mode, 'RGB')
+                    self.assertEqual(
+                        image.info.get('icc_profile'),
+                        b'RGB profile' if kept else None
+                    )
+
+    def test_limits(self):
+        """Проверяем, что слишком большие файлы и картинки с большим
+        числом пикселей отклоняются без создания поста."""
+        limits = {
+            'IMAGE_UPLOAD_MAX_BYTES': 100,
+            'IMAGE_UPLOAD_MAX_PIXELS': 100,
+        }
+        for setting, value in limits.items():
+            with self.subTest(setting=setting):
+                with mock.patch(f'posts.uploads.{setting}', value):
+                    response = self.create_post(make_jpeg())
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context['form'].errors['image'])
+                self.assertFalse(Post.objects.exists())
+
+    def test_upload_stopped_at_limit(self):
+        """Проверяем, что разбор запроса прерывается, как только файл
+        превысил лимит: поля после него уже не читаются."""
+        request = RequestFactory().post(POST_CREATE_URL, {
+            'image': SimpleUploadedFile(
+                name='photo.jpg',
+                content=make_jpeg(),
+                content_type='image/jpeg'
+            ),
+            'text': 'Поле после картинки',
+        })
+        handler = ImageUploadHandler(request)
+        request.upload_handlers = [handler]
+        with mock.patch('posts.uploads.IMAGE_UPLOAD_MAX_BYTES', 100):
+            self.assertFalse(request.FILES)
+        self.assertTrue(handler.too_large)
+        self.assertNotIn('text', request.POST)
+
+    def test_csrf_checked(self):
+        """Проверяем, что CSRF проверяется и после отключения проверки
+        в middleware."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = self.create_post(make_jpeg(), client)
+        self.assertTemplateUsed(response, 'core/403csrf.html')
+        self.assertFalse(Post.objects.exists())
@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.templatetags.static import static
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import images
+from ..models import Post, User
+from ..settings import (IMAGE_BASE_SIZE, IMAGE_VARIANTS_DIR,
+                        THUMBNAIL_PLACEHOLDER)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImagesTest(TestCase):
+    """Тестируем фоновую генерацию вариантов картинок."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='MrNobody')
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.user,
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=SMALL_GIF,
+                content_type='image/gif'
+            )
+        )
+        cls.DETAIL_URL = reverse(
+            'posts:post_detail',
+            kwargs={'post_id': cls.post.pk}
+        )
+        cls.guest = Client()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_placeholder_until_variants_ready(self):
+        """Проверяем, что до генерации вариантов выводится заглушка,
+        а после — <picture> с готовыми вариантами."""
+        self.assertContains(
+            self.guest.get(self.DETAIL_URL),
+            static(THUMBNAIL_PLACEHOLDER)
+        )
+        with mock.patch.object(images, '_get_executor') as executor:
+            images.schedule(self.post)
+            images.schedule(self.post)
+        self.assertEqual(executor.return_value.submit.call_count, 1)
+        self.assertEqual(images.metrics()['queue_depth'], 1)
+        images._run(self.post)
+        self.assertEqual(images.metrics()['queue_depth'], 0)
+        cache.clear()
+        variants = images.get_variants(Post.objects.get(pk=self.post.pk))
+        self.assertEqual(list(variants), images.available_formats())
+        response = self.guest.get(self.DETAIL_URL)
+        for width, url in variants['JPEG']:
+            self.assertContains(response, f'{url} {width}w')
+        self.assertNotContains(response, static(THUMBNAIL_PLACEHOLDER))
+
+    def test_variant_sizes(self):
+        """Проверяем, что варианты кадрируются под пропорции ленты
+        и не бывают шире исходной картинки, кроме базовой ширины."""
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 900), 'red').save(buffer, 'PNG')
+        name = default_storage.save(
+            'posts/large.png',
+            SimpleUploadedFile('large.png', buffer.getvalue())
+        )
+        variants = images.generate_variants(name)
+        base_width, base_height = IMAGE_BASE_SIZE
+        for image_format in images.available_formats():
+            self.assertEqual(
+                [width for width, url in variants[image_format]],
+                [480, 960]
+            )
+        width, path = variants['JPEG'][-1]
+        with default_storage.open(path) as file:
+            self.assertEqual(Image.open(file).size, (base_width, base_height))
+
+    def test_variants_not_duplicated(self):
+        """Проверяем, что повторная генерация не создаёт новых файлов,
+        а с overwrite перезаписывает прежние."""
+        name = self.post.image.name
+        variants = images.generate_variants(name)
+        directory = default_storage.path(IMAGE_VARIANTS_DIR)
+        files = sorted(os.listdir(directory))
+        self.assertEqual(images.generate_variants(name), variants)
+        self.assertEqual(
+            images.generate_variants(name, overwrite=True), variants
+        )
+        self.assertEqual(sorted(os.listdir(directory)), files)
@@ -0,0 +1,194 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import export, importing, search
+from ..models import Comment, Group, Post, Profile, User
+
+
+class ImportTest(TestCase):
+    """Тестирование массового импорта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, lines):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(''.join(f'{line}\n' for line in lines))
+        return path
+
+    def write_records(self, name, records):
+        return self.write(name, (
+            json.dumps(record, ensure_ascii=False) for record in records
+        ))
+
+    def test_import(self):
+        """Проверяем, что записи импортируются с датами и id, а счётчики
+        пересчитываются в конце."""
+        groups = self.write('groups.csv', (
+            'slug,title,description', 'old,Старая группа,Описание'
+        ))
+        posts = self.write_records('posts.ndjson', [
+            {'id': 100 + index, 'author': 'author',
+             'group': 'old' if index % 2 else None, 'text': f'Пост {index}',
+             'pub_date': f'2020-01-0{index + 1}T10:00:00.123456+00:00'}
+            for index in range(5)
+        ])
+        comments = self.write_records('comments.ndjson', [
+            {'post': 100, 'author': 'reader', 'text': 'Комментарий',
+             'created': '2020-02-01 10:00:00'},
+        ])
+        call_command(
+            'import_posts', groups=groups, posts=posts, comments=comments,
+            batch_size=2, stdout=open(os.devnull, 'w')
+        )
+        group = Group.objects.get(slug='old')
+        self.assertEqual(group.title, 'Старая группа')
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.pub_date.day, 1)
+        self.assertEqual(post.pub_date.microsecond, 123456)
+        self.assertEqual(post.updated_at, post.pub_date)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Post.objects.filter(group=group).count(), 2)
+        self.assertEqual(
+            Comment.objects.get().created.isoformat(),
+            '2020-02-01T10:00:00+00:00'
+        )
+        self.assertEqual(Profile.objects.get(user=self.author).posts_count, 5)
+
+    def test_export_round_trip(self):
+        group = Group.objects.create(title='Группа', slug='group')
+        post = Post.objects.create(
+            text='Пост, "с кавычками"\nи переносом',
+            author=self.author,
+            group=group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Ответ')
+        paths = {}
+        for kind, export_format in (('posts', 'csv'), ('comments', 'ndjson')):
+            paths[kind] = os.path.join(
+                self.directory, export.filename(kind, export_format, True)
+            )
+            call_command(
+                'export_posts', kind=kind, format=export_format, gzip=True,
+                output=paths[kind]
+            )
+        expected = list(Post.objects.values_list(
+            'pk', 'text', 'author', 'group', 'pub_date', 'updated_at'
+        ))
+        Post.objects.all().delete()
+        call_command('import_posts', **paths, stdout=open(os.devnull, 'w'))
+        self.assertEqual(list(Post.objects.values_list(
+            'pk', 'text', 'author', 'group', 'pub_date', 'updated_at'
+        )), expected)
+        self.assertEqual(Comment.objects.get().post_id, post.pk)
+
+    def test_checkpoint(self):
+        """Проверяем, что импорт продолжается с контрольной точки и
+        повторно не записывает уже импортированное."""
+        posts = self.write_records('posts.ndjson', [
+            {'author': 'author', 'text': f'Пост {index}'}
+            for index in range(5)
+        ])
+        importing.Checkpoint(f'{posts}.checkpoint').save(3)
+        importer = importing.Importer()
+        self.assertEqual(
+            importing.import_file(importer, 'posts', posts, 'ndjson'), 5
+        )
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('text', flat=True)),
+            ['Пост 3', 'Пост 4']
+        )
+        importing.import_file(importer, 'posts', posts, 'ndjson')
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_imported_posts_indexed(self):
+        """Проверяем, что импортированные посты, с id и без, попадают в
+        поисковый индекс, в том числе записанные до прерывания, а
+        остальные посты заново не индексируются."""
+        other = Post.objects.create(text='Чужой пост', author=self.author)
+        search.remove_post(other.pk)
+        posts = self.write_records('posts.ndjson', [
+            {'id': 500, 'author': 'author', 'text': 'Импорт алмаз'},
+            {'author': 'author', 'text': 'Импорт берёза'},
+            {'author': 'author', 'text': 'Импорт вишня'},
+        ])
+        importing.import_file(
+            importing.Importer(), 'posts', posts, 'ndjson', batch_size=2
+        )
+        importing.Checkpoint(f'{posts}.checkpoint').save(2, [(500, 501)])
+        importer = importing.Importer()
+        importing.import_file(importer, 'posts', posts, 'ndjson')
+        importing.finish(importer.post_ranges)
+        for text in ('алмаз', 'берёза', 'вишня'):
+            with self.subTest(text=text):
+                self.assertEqual(len(search.search_posts(text)), 1)
+        self.assertEqual(search.search_posts('Чужой'), [])
+
+    def test_existing_records_not_counted(self):
+        """Проверяем, что уже записанные id и slug групп пропускаются и не
+        попадают в число записанных, например при повторе пачки."""
+        Group.objects.create(title='Группа', slug='old')
+        groups = self.write_records('groups.ndjson', [
+            {'slug': 'old'}, {'slug': 'new'}, {'slug': 'new'},
+        ])
+        posts = self.write_records('posts.ndjson', [
+            {'id': 100 + index % 3, 'author': 'author', 'text': 'Пост'}
+            for index in range(4)
+        ])
+        importer = importing.Importer()
+        importing.import_file(importer, 'groups', groups, 'ndjson')
+        importing.import_file(importer, 'posts', posts, 'ndjson')
+        self.assertEqual(importer.imported, {'groups': 1, 'posts': 3})
+        self.assertEqual(importer.skipped, {'exists': 3})
+        importer = importing.Importer()
+        importing.import_file(
+            importer, 'posts', posts, 'ndjson',
+            checkpoint=importing.Checkpoint(f'{posts}.again')
+        )
+        self.assertEqual(importer.imported, {'posts': 0})
+        self.assertEqual(importer.skipped, {'exists': 4})
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_unknown_references(self):
+        """Проверяем, что записи с неизвестными ссылками пропускаются,
+        а авторы с --create-users создаются."""
+        posts = self.write_records('posts.ndjson', [
+            {'author': 'newcomer', 'text': 'Пост'},
+            {'author': 'author', 'group': 'missing', 'text': 'Пост'},
+            {'author': 'author'},
+        ])
+        comments = self.write_records('comments.ndjson', [
+            {'post': 0, 'author': 'author', 'text': 'Комментарий'},
+        ])
+        importer = importing.Importer()
+        importing.import_file(importer, 'posts', posts, 'ndjson')
+        importing.import_file(importer, 'comments', comments, 'ndjson')
+        self.assertEqual(dict(importer.skipped), {
+            'author': 1, 'group': 1, 'invalid': 1, 'post': 1
+        })
+        self.assertFalse(Post.objects.exists())
+        importer = importing.Importer(create_users=True)
+        importing.import_file(
+            importer, 'posts', posts, 'ndjson',
+            checkpoint=importing.Checkpoint(f'{posts}.again')
+        )
+        self.assertEqual(
+            Post.objects.get().author.username, 'newcomer'
+        )
+        self.assertFalse(User.objects.get(
+            username='newcomer'
+        ).has_usable_password())
@@ -1,6 +1,10 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from ..models import Follow, Group, Post, User
 
 
 class PostModelTests(TestCase):
@@ -57,3 +61,24 @@ class PostModelTests(TestCase):
                     Post._meta.get_field(value).help_text,
                     expected
                 )
+
+    def test_follow_is_unique(self):
+        """Проверяем, что подписаться на автора дважды нельзя."""
+        author = User.objects.create_user(username='Author')
+        Follow.objects.create(user=self.user, author=author)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.user, author=author)
+
+    def test_feed_queries_use_composite_indexes(self):
+        """Проверяем, что главная лента и ленты профиля и группы читаются
+        по составным индексам без отдельной сортировки."""
+        Post.objects.create(text='Пост группы', author=self.user,
+                            group=self.group)
+        out = StringIO()
+        call_command('feed_query_plans', repeat=1, stdout=out)
+        plans = out.getvalue()
+        for index in ('post_pub_date_id_idx', 'post_author_pub_date_id_idx',
+                      'post_group_pub_date_id_idx'):
+            with self.subTest(index=index):
+                self.assertIn(index, plans)
+        self.assertNotIn('TEMP B-TREE', plans)
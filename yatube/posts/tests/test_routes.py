@@ -18,7 +18,14 @@ class PostRoutesTest(TestCase):
             [f'/profile/{USERNAME}/', 'profile', {'username': USERNAME}],
             [f'/posts/{POST_ID}/', 'post_detail', {'post_id': POST_ID}],
             [f'/posts/{POST_ID}/edit/', 'post_edit', {'post_id': POST_ID}],
+            [
+                f'/posts/{POST_ID}/comments/',
+                'post_comments',
+                {'post_id': POST_ID}
+            ],
             ['/follow/', 'follow_index', {}],
+            ['/follow/bulk/', 'follow_many', {}],
+            ['/search/', 'search', {}],
             [
                 f'/profile/{USERNAME}/follow/',
                 'profile_follow',
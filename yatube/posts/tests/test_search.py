@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from ..models import Post, SearchTerm, User
+from ..search import InvertedIndex, search_posts
+from ..stemmer import stem
+
+SEARCH_URL = reverse('posts:search')
+
+
+class StemmerTest(TestCase):
+    """Тестируем стеммер."""
+
+    def test_stem(self):
+        """Проверяем основы слов по словарю Snowball."""
+        words_stems = {
+            'абиссинию': 'абиссин',
+            'авторитетности': 'авторитетн',
+            'важнейшими': 'важн',
+            'вагоны': 'вагон',
+            'вдохновение': 'вдохновен',
+            'ёлки': 'елк',
+            'python': 'python',
+        }
+        for word, expected in words_stems.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+
+class PostSearchTest(TestCase):
+    """Тестируем поиск по постам."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='MrNobody')
+
+    def setUp(self):
+        self.cat_post = Post.objects.create(
+            text='Кошки любят молоко. Кошка спит.',
+            author=self.user
+        )
+        self.dog_post = Post.objects.create(
+            text='Собаки и кошки живут вместе',
+            author=self.user
+        )
+
+    def check_search(self):
+        self.assertEqual(
+            search_posts('кошками'),
+            [self.cat_post.pk, self.dog_post.pk]
+        )
+        self.assertEqual(search_posts('собака кошкам'), [self.dog_post.pk])
+        self.assertEqual(search_posts('жираф'), [])
+        self.dog_post.text = 'Собаки живут отдельно'
+        self.dog_post.save()
+        self.assertEqual(search_posts('кошки'), [self.cat_post.pk])
+        cat_post_pk = self.cat_post.pk
+        self.cat_post.delete()
+        self.assertEqual(search_posts('кошки'), [])
+        return cat_post_pk
+
+    def test_fts_search(self):
+        """Проверяем ранжирование и обновление индекса FTS5."""
+        self.check_search()
+
+    def test_inverted_index_search(self):
+        """Проверяем ранжирование и обновление инвертированного индекса."""
+        with mock.patch('posts.search.has_fts', return_value=False):
+            InvertedIndex().index(self.cat_post)
+            InvertedIndex().index(self.dog_post)
+            cat_post_pk = self.check_search()
+        self.assertFalse(SearchTerm.objects.filter(
+            post_id=cat_post_pk
+        ).exists())
+
+    def test_search_page(self):
+        """Проверяем, что страница поиска выводит найденные посты."""
+        response = self.client.get(SEARCH_URL, {'q': 'собаки'})
+        self.assertEqual(list(response.context['page_obj']), [self.dog_post])
+
+    def test_admin_search(self):
+        """Проверяем, что поиск в админке идёт через индекс."""
+        model_admin = site._registry[Post]
+        queryset, _ = model_admin.get_search_results(
+            RequestFactory().get('/'),
+            Post.objects.all(),
+            'молоком'
+        )
+        self.assertEqual(list(queryset), [self.cat_post])
@@ -0,0 +1,79 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from .. import seeding
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+COUNTS = {
+    'users': 30, 'groups': 4, 'posts': 120, 'comments': 200, 'follows': 4,
+}
+
+
+def seed(**options):
+    call_command(
+        'seed', **{**COUNTS, **options}, stdout=StringIO()
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedCommandTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seed_creates_rows(self):
+        """Команда создаёт заданное число строк и восстанавливает
+        счётчики и ленты."""
+        seed()
+        self.assertEqual(User.objects.count(), COUNTS['users'])
+        self.assertEqual(Group.objects.count(), COUNTS['groups'])
+        self.assertEqual(Post.objects.count(), COUNTS['posts'])
+        self.assertEqual(Comment.objects.count(), COUNTS['comments'])
+        author = User.objects.filter(posts__isnull=False).first()
+        self.assertEqual(author.profile.posts_count, author.posts.count())
+        followed = Follow.objects.values_list('author_id', flat=True)
+        self.assertEqual(
+            TimelineEntry.objects.count(),
+            sum(Post.objects.filter(author_id=author_id).count()
+                for author_id in followed)
+        )
+
+    def test_seed_is_deterministic(self):
+        """При том же зерне генерируются те же данные."""
+        def snapshot():
+            return (
+                list(Post.objects.order_by('author__username', 'text')
+                     .values_list('author__username', 'text')),
+                list(Follow.objects.order_by('user__username',
+                                             'author__username')
+                     .values_list('user__username', 'author__username')),
+            )
+
+        seed(seed=7)
+        first = snapshot()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        seed(seed=7)
+        self.assertEqual(snapshot(), first)
+
+    def test_seed_placeholder_images(self):
+        """Картинки-заглушки создаются и достаются доле постов."""
+        seed(images=2, image_share=1)
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(
+            names, {seeding.PLACEHOLDER.format(index) for index in range(2)}
+        )
+
+    def test_seed_rejects_bad_options(self):
+        for options in ({'workers': 0}, {'group_share': 2}):
+            with self.subTest(options=options):
+                with self.assertRaises(CommandError):
+                    seed(**options)
@@ -15,6 +15,8 @@ PROFILE_URL = reverse('posts:profile', kwargs={'username': USERNAME})
 UNEXISTING_PAGE = '/unexisting_page/'
 LOGIN_URL = reverse('users:login')
 FOLLOW_INDEX_URL = reverse('posts:follow_index')
+SEARCH_URL = reverse('posts:search')
+FOLLOW_MANY_URL = reverse('posts:follow_many')
 FOLLOW_URL = reverse('posts:profile_follow', kwargs={'username': USERNAME})
 UNFOLLOW_URL = reverse(
     'posts:profile_unfollow',
@@ -73,6 +75,9 @@ class PostsURLTest(TestCase):
             [FOLLOW_INDEX_URL, self.authorized, HTTPStatus.OK],
             [FOLLOW_URL, self.guest, HTTPStatus.FOUND],
             [UNFOLLOW_URL, self.guest, HTTPStatus.FOUND],
+            [SEARCH_URL, self.guest, HTTPStatus.OK],
+            [FOLLOW_MANY_URL, self.guest, HTTPStatus.FOUND],
+            [FOLLOW_MANY_URL, self.authorized, HTTPStatus.METHOD_NOT_ALLOWED],
         ]
         for url, client, code in users_urls_names_status_code:
             with self.subTest(url=url, client=client):
@@ -90,6 +95,7 @@ class PostsURLTest(TestCase):
             [self.EDIT_URL, self.author_client, 'posts/create_post.html'],
             [UNEXISTING_PAGE, self.guest, 'core/404.html'],
             [FOLLOW_INDEX_URL, self.authorized, 'posts/follow.html'],
+            [SEARCH_URL, self.guest, 'posts/search.html'],
         ]
         for url, client, template in urls_users_templates:
             with self.subTest(url=url, client=client):
@@ -1,14 +1,24 @@
+import base64
+import json
 import shutil
 import tempfile
+from io import StringIO
+from unittest import mock
 
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.db import connection, router
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Group, Post, User
-from ..settings import PAGINATOR_NUM_PAGES
+from .. import feed_cache
+from ..models import (Comment, Follow, Group, Post, Profile, TimelineEntry,
+                      User)
+from ..settings import COMMENTS_PER_PAGE, PAGINATOR_NUM_PAGES
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -27,6 +37,13 @@ UNFOLLOWING_URL = reverse(
     'posts:profile_unfollow',
     kwargs={'username': USERNAME}
 )
+FOLLOW_MANY_URL = reverse('posts:follow_many')
+FEED_QUERIES_BUDGET = {
+    INDEX_URL: 4,
+    GROUP_LIST_URL: 5,
+    PROFILE_URL: 6,
+    FOLLOW_URL: 6,
+}
 SMALL_GIF = (
     b'\x47\x49\x46\x38\x39\x61\x02\x00'
     b'\x01\x00\x80\x00\x00\x00\x00\x00'
@@ -115,6 +132,127 @@ class PostViewsTest(TestCase):
                         num_records
                     )
 
+    def test_cursor_pagination(self):
+        """Проверка курсорной пагинации: страницы не пересекаются,
+        ссылки «вперёд» и «назад» возвращают к тем же записям."""
+        Post.objects.bulk_create(
+            (Post(text='Тестовый текст', author=self.user, group=self.group)
+             for _ in range(PAGINATOR_NUM_PAGES + 2))
+        )
+        for url in (INDEX_URL, GROUP_LIST_URL, PROFILE_URL):
+            cache.clear()
+            with self.subTest(url=url):
+                first = self.authorized_client.get(
+                    url + '?cursor='
+                ).context['page_obj']
+                self.assertEqual(len(first), PAGINATOR_NUM_PAGES)
+                self.assertFalse(first.has_previous())
+                second = self.authorized_client.get(
+                    f'{url}?cursor={first.next_cursor}'
+                ).context['page_obj']
+                self.assertEqual(len(second), 3)
+                self.assertFalse(second.has_next())
+                self.assertFalse(set(first) & set(second))
+                back = self.authorized_client.get(
+                    f'{url}?cursor={second.previous_cursor}'
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+
+    def test_invalid_cursor(self):
+        """Проверяем, что подделанный курсор даёт первую страницу,
+        а не ошибку сервера."""
+        comments_url = reverse(
+            'posts:post_comments', kwargs={'post_id': self.post.pk}
+        )
+        positions = (
+            ['n', 'garbage', '1'],
+            ['n', '2020-01-01T00:00:00', 'abc'],
+            ['p', None, None],
+            ['n', ['2020-01-01T00:00:00'], {'id': 1}],
+            ['x', '2020-01-01T00:00:00', '1'],
+            'n',
+        )
+        urls = (
+            INDEX_URL, GROUP_LIST_URL, PROFILE_URL, comments_url,
+            reverse('api:post_list'),
+        )
+        for position in positions:
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(position).encode()
+            ).decode()
+            for url in urls:
+                cache.clear()
+                with self.subTest(position=position, url=url):
+                    response = self.authorized_client.get(
+                        url, {'cursor': cursor}
+                    )
+                    self.assertEqual(response.status_code, 200)
+
+    @override_settings(REPLICA_DATABASES=['replica'])
+    def test_cached_feed_pages_read_from_primary(self):
+        """Проверяем, что страница, которая попадёт в кэш под текущей
+        версией ленты, читается не с реплики."""
+        databases = []
+        get_page = Paginator.get_page
+
+        def spy(*args, **kwargs):
+            databases.append(router.db_for_read(Post))
+            return get_page(*args, **kwargs)
+
+        cache.clear()
+        with mock.patch.object(Paginator, 'get_page', spy):
+            response = self.client.get(INDEX_URL)
+        self.assertContains(response, self.post.text)
+        self.assertEqual(databases, ['default'])
+
+    def test_feed_cache_key_uses_checked_position(self):
+        """Проверяем, что в ключ кэша страницы попадает позиция после
+        проверки: неверные и лишние значения page и cursor не заводят
+        новых ключей."""
+        def key(**params):
+            return self.client.get(INDEX_URL, params).context[
+                'feed_cache_key'
+            ]
+
+        first = key()
+        cursor_first = key(cursor='')
+        for params, expected in (
+            ({'page': 'abc'}, first),
+            ({'page': '1'}, first),
+            ({'page': '999'}, first),
+            ({'page': '1', 'junk': 'x'}, first),
+            ({'cursor': 'abc'}, cursor_first),
+            ({'cursor': 'abc', 'page': '2'}, cursor_first),
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(key(**params), expected)
+
+    def test_feed_query_budget(self):
+        """Проверяем, что число запросов к базе на страницу ленты не зависит
+        от числа авторов и групп на странице."""
+        for i in range(PAGINATOR_NUM_PAGES):
+            author = User.objects.create_user(username=f'Author{i}')
+            Follow.objects.create(user=self.another, author=author)
+            Post.objects.create(
+                text='Тестовый текст',
+                author=author,
+                group=Group.objects.create(
+                    title=f'Группа {i}',
+                    slug=f'group-{i}',
+                    description='Тестовое описание'
+                )
+            )
+            Post.objects.create(
+                text='Тестовый текст',
+                author=self.user,
+                group=self.group
+            )
+        for url, budget in FEED_QUERIES_BUDGET.items():
+            cache.clear()
+            with self.subTest(url=url):
+                with self.assertNumQueries(budget):
+                    self.another_client.get(url)
+
     def test_correct_create_new_post(self):
         """Проверка, что пост попал на страницы без искажения данных."""
         urls = (
@@ -173,7 +311,7 @@ class PostViewsTest(TestCase):
     def test_cache_index(self):
         """Тестируем работу кэширования на главной странице."""
         content_before_create = self.authorized_client.get(INDEX_URL).content
-        Post.objects.all().delete()
+        Post.objects.update(text='Изменённый в обход модели текст')
         response_after_create = self.authorized_client.get(INDEX_URL).content
         self.assertEqual(content_before_create, response_after_create)
         cache.clear()
@@ -181,6 +319,97 @@ class PostViewsTest(TestCase):
             INDEX_URL).content
         self.assertNotEqual(content_before_create, content_after_clear_cache)
 
+    def test_cache_invalidated_by_post_changes(self):
+        """Проверяем, что создание и удаление поста сразу видны в лентах,
+        а страницы ленты кэшируются по отдельности."""
+        urls = (INDEX_URL, GROUP_LIST_URL, PROFILE_URL, FOLLOW_URL)
+        for url in urls:
+            self.another_client.get(url)
+        post = Post.objects.create(
+            text='Новый тестовый текст',
+            author=self.user,
+            group=self.group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.another_client.get(url), post.text)
+        post.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNotContains(
+                    self.another_client.get(url),
+                    post.text
+                )
+        Post.objects.bulk_create(
+            (Post(text=f'Пост {i}', author=self.user)
+             for i in range(PAGINATOR_NUM_PAGES + 2))
+        )
+        cache.clear()
+        self.assertNotEqual(
+            self.another_client.get(INDEX_URL).content,
+            self.another_client.get(INDEX_URL + '?page=2').content
+        )
+
+    def test_post_fragments_shared_between_feeds(self):
+        """Проверяем, что HTML поста рендерится один раз для всех лент,
+        а правка поста и смена имени автора дают новый фрагмент."""
+        self.another_client.get(INDEX_URL)
+        Post.objects.filter(pk=self.post.pk).update(
+            text='Изменённый в обход модели текст'
+        )
+        for url in (PROFILE_URL, FOLLOW_URL):
+            with self.subTest(url=url):
+                response = self.another_client.get(url)
+                self.assertContains(response, 'Тестовый текст')
+                self.assertNotContains(response, 'Изменённый')
+        self.authorized_client.post(
+            self.EDIT_URL, {'text': 'Отредактированный текст', 'group': ''}
+        )
+        self.assertContains(
+            self.another_client.get(FOLLOW_URL), 'Отредактированный текст'
+        )
+        self.user.first_name = 'Лев'
+        self.user.last_name = 'Толстой'
+        self.user.save()
+        for url in (INDEX_URL, PROFILE_URL, FOLLOW_URL):
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.another_client.get(url), 'Лев Толстой'
+                )
+
+    def test_group_change_refreshes_feeds(self):
+        """Проверяем, что новое название и адрес группы сразу видны
+        в закэшированных лентах."""
+        for url in (INDEX_URL, PROFILE_URL, FOLLOW_URL):
+            self.another_client.get(url)
+        self.group.title = 'Новый заголовок'
+        self.group.slug = 'new-slug'
+        self.group.save()
+        for url in (INDEX_URL, PROFILE_URL, FOLLOW_URL):
+            with self.subTest(url=url):
+                response = self.another_client.get(url)
+                self.assertContains(response, 'Новый заголовок')
+                self.assertContains(response, reverse(
+                    'posts:group_list', kwargs={'slug': 'new-slug'}
+                ))
+
+    def test_post_fragments_fetched_at_once(self):
+        """Проверяем, что фрагменты страницы читаются одним get_many."""
+        self.another_client.get(INDEX_URL)
+        feed_cache.bump(feed_cache.INDEX_FEED)
+        with mock.patch.object(
+            cache, 'get_many', wraps=cache.get_many
+        ) as get_many, mock.patch(
+            'posts.fragments.get_template'
+        ) as get_template:
+            self.another_client.get(INDEX_URL)
+        fragment_calls = [
+            call for call in get_many.call_args_list
+            if call[0][0][0].startswith('post-fragment:')
+        ]
+        self.assertEqual(len(fragment_calls), 1)
+        get_template.assert_not_called()
+
     def test_following(self):
         """Проверяем, что авторизованный пользователь может подписываться
         на других пользователей и удалять их из подписок."""
@@ -189,6 +418,197 @@ class PostViewsTest(TestCase):
             self.following.follower.filter(user=self.following).exists()
         )
 
+    def test_comments_paginated(self):
+        """Проверяем, что на странице поста выводится не больше
+        COMMENTS_PER_PAGE комментариев, остальные подгружаются по курсору,
+        а число запросов не зависит от числа комментариев."""
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.another, text=f'Текст {i}')
+            for i in range(COMMENTS_PER_PAGE + 1)
+        )
+        with self.assertNumQueries(4):
+            response = self.another_client.get(self.DETAIL_URL)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertTrue(comments.has_next())
+        data = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            {'cursor': comments.next_cursor}
+        ).json()
+        self.assertIn(f'Текст {COMMENTS_PER_PAGE}', data['html'])
+        self.assertIsNone(data['next_cursor'])
+
+    def test_post_detail_conditional_get(self):
+        """Проверяем, что страница поста отдаёт 304 без рендеринга,
+        пока пост не изменился, а комментарий и правка меняют ETag.
+        Комментарий не сдвигает updated_at, от которого зависит кэш
+        фрагмента поста в лентах."""
+        response = self.another_client.get(self.DETAIL_URL)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.another_client.get(
+            self.DETAIL_URL,
+            HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+        ).status_code, 200)
+        with self.assertNumQueries(3):
+            response = self.another_client.get(
+                self.DETAIL_URL, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        updated_at = Post.objects.get(pk=self.post.pk).updated_at
+        self.another_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Новый комментарий'}
+        )
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).updated_at, updated_at
+        )
+        response = self.another_client.get(
+            self.DETAIL_URL, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.authorized_client.post(
+            self.EDIT_URL, {'text': 'Изменённый текст', 'group': ''}
+        )
+        response = self.another_client.get(
+            self.DETAIL_URL, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Изменённый текст')
+
+    def test_feeds_conditional_get(self):
+        """Проверяем, что ленты группы и профиля отдают 304, пока
+        в них ничего не поменялось, и ETag зависит от пользователя."""
+        for url in (INDEX_URL, GROUP_LIST_URL, PROFILE_URL):
+            with self.subTest(url=url):
+                etag = self.another_client.get(url)['ETag']
+                response = self.another_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                response = self.following_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+        etags = {
+            url: self.another_client.get(url)['ETag']
+            for url in (GROUP_LIST_URL, PROFILE_URL)
+        }
+        Post.objects.create(text='Ещё пост', author=self.user,
+                            group=self.group)
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.another_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_follow_is_idempotent(self):
+        """Проверяем, что повторная подписка не создаёт дубликатов
+        и не увеличивает счётчики, а на себя подписаться нельзя."""
+        for _ in range(2):
+            self.another_client.get(FOLLOWING_URL)
+        self.authorized_client.get(FOLLOWING_URL)
+        self.assertEqual(Follow.objects.filter(author=self.user).count(), 1)
+        self.assertEqual(
+            Profile.objects.get(user=self.user).followers_count, 1
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.another).following_count, 1
+        )
+
+    def test_follow_many(self):
+        """Проверяем подписку на список авторов одним запросом."""
+        response = self.following_client.post(
+            FOLLOW_MANY_URL,
+            json.dumps({'authors': [USERNAME, 'Another', 'Following',
+                                    'Unknown']}),
+            content_type='application/json'
+        )
+        self.assertEqual(
+            sorted(response.json()['followed']), ['Another', USERNAME]
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.following).following_count, 2
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.following, post=self.post
+        ).exists())
+        self.assertIn(
+            self.post,
+            self.following_client.get(FOLLOW_URL).context['page_obj']
+        )
+        response = self.following_client.post(
+            FOLLOW_MANY_URL,
+            json.dumps({'authors': [USERNAME]}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.json()['followed'], [])
+        for body in ('{', json.dumps({'authors': 'MrNobody'})):
+            with self.subTest(body=body):
+                self.assertEqual(self.following_client.post(
+                    FOLLOW_MANY_URL, body, content_type='application/json'
+                ).status_code, 400)
+
+    def test_follow_many_without_returning(self):
+        """Проверяем, что без RETURNING существующие подписки не считаются
+        новыми, а счётчики сдвигаются только на изменившиеся."""
+        body = json.dumps({'authors': [USERNAME, 'Another']})
+        with mock.patch(
+            'posts.follows._supports_returning', return_value=False
+        ):
+            self.following_client.get(FOLLOWING_URL)
+            response = self.following_client.post(
+                FOLLOW_MANY_URL, body, content_type='application/json'
+            )
+            self.assertEqual(response.json()['followed'], ['Another'])
+            self.assertEqual(
+                Profile.objects.get(user=self.following).following_count, 2
+            )
+            self.following_client.get(UNFOLLOWING_URL)
+            self.following_client.get(UNFOLLOWING_URL)
+        self.assertEqual(
+            Profile.objects.get(user=self.following).following_count, 1
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.user).followers_count, 1
+        )
+
+    def test_follow_locks_before_reading_without_returning(self):
+        """Проверяем, что без RETURNING блокировка записи берётся до
+        чтения текущих подписок, а не после."""
+        for url in (FOLLOWING_URL, UNFOLLOWING_URL):
+            with self.subTest(url=url):
+                with mock.patch(
+                    'posts.follows._supports_returning', return_value=False
+                ), CaptureQueriesContext(connection) as context:
+                    self.following_client.get(url)
+                queries = [query['sql'] for query in context]
+                lock = next(
+                    index for index, sql in enumerate(queries)
+                    if sql.startswith('UPDATE "posts_profile"')
+                )
+                read = next(
+                    index for index, sql in enumerate(queries)
+                    if sql.startswith('SELECT "posts_follow"."author_id"')
+                )
+                self.assertLess(lock, read)
+
+    def test_follow_checks_fanout_after_counting(self):
+        """Проверяем, что посты автора, ставшего популярным после новой
+        подписки, не рассылаются в ленту, а дочитываются при чтении."""
+        with mock.patch('posts.timeline.FANOUT_FOLLOWERS_LIMIT', 1):
+            self.following_client.get(FOLLOWING_URL)
+            self.assertFalse(
+                TimelineEntry.objects.filter(user=self.following).exists()
+            )
+            self.assertIn(
+                self.post,
+                self.following_client.get(FOLLOW_URL).context['page_obj']
+            )
+
     def test_unfollowing(self):
         """Проверяем, что пользователь отписался от автора."""
         self.another_client.get(UNFOLLOWING_URL)
@@ -205,3 +625,129 @@ class PostViewsTest(TestCase):
         )
         response_for_unfollower = self.following_client.get(FOLLOW_URL)
         self.assertNotIn(post, response_for_unfollower.context['page_obj'])
+
+    def test_new_post_fanned_out_to_followers(self):
+        """Проверяем, что новый пост попадает в материализованную ленту
+        подписчика, а после отписки записи автора из неё удаляются."""
+        post = Post.objects.create(text='Тестовый текст', author=self.user)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.another, post=post
+        ).exists())
+        self.assertIn(
+            post,
+            self.another_client.get(FOLLOW_URL).context['page_obj']
+        )
+        self.another_client.get(UNFOLLOWING_URL)
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.another).exists()
+        )
+
+    def test_follow_feed_reads_popular_authors(self):
+        """Проверяем, что посты популярного автора не рассылаются по лентам,
+        но попадают в ленту подписчика при чтении."""
+        with mock.patch('posts.timeline.FANOUT_FOLLOWERS_LIMIT', 0):
+            post = Post.objects.create(
+                text='Тестовый текст',
+                author=self.user
+            )
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=post).exists()
+            )
+            self.assertIn(
+                post,
+                self.another_client.get(FOLLOW_URL).context['page_obj']
+            )
+
+    def test_follow_feed_merges_sources(self):
+        """Проверяем, что лента подписок сливает разосланные посты и посты
+        популярного автора в порядке даты без повторов — по номерам
+        страниц и по курсору."""
+        popular = User.objects.create_user(username='Popular')
+        with mock.patch('posts.timeline.FANOUT_FOLLOWERS_LIMIT', 1):
+            Follow.objects.create(user=self.another, author=popular)
+            Follow.objects.create(user=self.following, author=popular)
+            for i in range(PAGINATOR_NUM_PAGES):
+                Post.objects.create(text='Тестовый текст', author=self.user)
+                Post.objects.create(text='Тестовый текст', author=popular)
+            # Запись, оставшаяся от времени, когда автор не был популярным.
+            left = Post.objects.filter(author=popular).first()
+            TimelineEntry.objects.create(
+                user=self.another, post=left, pub_date=left.pub_date
+            )
+            expected = list(Post.objects.filter(
+                author__in=(self.user, popular)
+            ).order_by('-pub_date', '-id'))
+            pages = [
+                self.another_client.get(FOLLOW_URL, {'page': number})
+                .context['page_obj'] for number in (1, 2, 3)
+            ]
+            self.assertEqual(pages[0].paginator.count, len(expected))
+            self.assertEqual(
+                [post for page in pages for post in page], expected
+            )
+            posts = []
+            cursor = ''
+            while cursor is not None:
+                page = self.another_client.get(
+                    FOLLOW_URL, {'cursor': cursor}
+                ).context['page_obj']
+                posts.extend(page)
+                cursor = page.next_cursor
+            self.assertEqual(posts, expected)
+            previous = self.another_client.get(
+                FOLLOW_URL, {'cursor': page.previous_cursor}
+            ).context['page_obj']
+            self.assertEqual(
+                list(previous),
+                expected[-len(page) - PAGINATOR_NUM_PAGES:-len(page)]
+            )
+
+    def test_author_below_fanout_limit(self):
+        """Проверяем, что когда у автора становится не больше
+        FANOUT_FOLLOWERS_LIMIT подписчиков, его посты, не разосланные
+        по лентам, остаются в ленте подписок."""
+        with mock.patch('posts.timeline.FANOUT_FOLLOWERS_LIMIT', 1):
+            self.following_client.get(FOLLOWING_URL)
+            post = Post.objects.create(
+                text='Тестовый текст',
+                author=self.user
+            )
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=post).exists()
+            )
+            self.another_client.get(UNFOLLOWING_URL)
+            self.assertEqual(
+                set(TimelineEntry.objects.filter(
+                    user=self.following
+                ).values_list('post', flat=True)),
+                {self.post.pk, post.pk}
+            )
+            page = self.following_client.get(FOLLOW_URL).context['page_obj']
+            self.assertIn(post, page)
+            self.assertIn(self.post, page)
+
+    def test_counters(self):
+        """Проверяем, что счётчики постов, подписок и комментариев
+        обновляются при изменениях и восстанавливаются командой."""
+        Comment.objects.create(post=self.post, author=self.another, text='Т')
+        self.following_client.get(FOLLOWING_URL)
+        expected = {
+            'posts_count': 1,
+            'followers_count': 2,
+            'following_count': 0,
+        }
+        author = self.authorized_client.get(PROFILE_URL).context['author']
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(author.profile, field), value)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        Profile.objects.update(posts_count=0, followers_count=0)
+        Post.objects.update(comments_count=0)
+        call_command('recount_counters', stdout=StringIO())
+        profile = Profile.objects.get(user=self.user)
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(profile, field), value)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
@@ -0,0 +1,206 @@
+from itertools import islice
+
+from django.db import connections, router
+
+from .models import Follow, Post, Profile, TimelineEntry
+from .paginators import after
+from .settings import FANOUT_BATCH_SIZE, FANOUT_FOLLOWERS_LIMIT
+
+
+def is_fanout_author(author_id):
+    """Посты автора рассылаются по лентам при записи, если у него
+    не больше FANOUT_FOLLOWERS_LIMIT подписчиков; ленты подписчиков
+    популярных авторов дочитывают их посты при чтении."""
+    return not Profile.objects.filter(
+        user_id=author_id,
+        followers_count__gt=FANOUT_FOLLOWERS_LIMIT
+    ).exists()
+
+
+def pull_authors(user):
+    """Популярные авторы из подписок пользователя."""
+    return Follow.objects.filter(
+        user=user,
+        author__profile__followers_count__gt=FANOUT_FOLLOWERS_LIMIT
+    ).values('author')
+
+
+class FollowFeed:
+    """Лента подписок для Paginator и CursorPaginator (сортировка
+    -pub_date, -id). Без OR по двум источникам: позиции страницы
+    выбираются двумя запросами по индексам — записями TimelineEntry
+    пользователя (user, -pub_date, -post) и постами популярных авторов
+    (author, -pub_date, -id) — и сливаются по ключу (pub_date, id).
+    Сами посты страницы читаются из queryset по первичному ключу;
+    feed() и values() меняют только этот queryset. Популярные авторы
+    читаются один раз; без них второй источник не запрашивается."""
+    model = Post
+    ordering = ('-pub_date', '-id')
+
+    def __init__(self, user, queryset=None, authors=None):
+        self.user = user
+        self.queryset = Post.objects.all() if queryset is None else queryset
+        self._authors = authors
+
+    @property
+    def authors(self):
+        """id популярных авторов из подписок пользователя."""
+        if self._authors is None:
+            self._authors = list(
+                pull_authors(self.user).values_list('author', flat=True)
+            )
+        return self._authors
+
+    def feed(self):
+        return FollowFeed(self.user, self.queryset.feed(), self.authors)
+
+    def values(self, *fields):
+        return FollowFeed(
+            self.user, self.queryset.values(*fields), self.authors
+        )
+
+    def _entries(self):
+        return TimelineEntry.objects.filter(user=self.user)
+
+    def _pulled(self):
+        return Post.objects.filter(author__in=self.authors)
+
+    def count(self):
+        count = self._entries().count()
+        if self.authors:
+            # Записи могли остаться от времени, когда автор ещё не был
+            # популярным: такие посты не считаются второй раз.
+            count += self._pulled().exclude(
+                pk__in=self._entries().values('post')
+            ).count()
+        return count
+
+    def __getitem__(self, index):
+        # Paginator берёт срез [bottom:top] от начала ленты.
+        return self.select_page(self.ordering, None, index.stop)[
+            index.start or 0:
+        ]
+
+    def select_page(self, ordering, position, limit):
+        """До limit постов после position в порядке self.ordering или
+        обратном ему."""
+        descending = ordering[0].startswith('-')
+        sign = '-' if descending else ''
+        entries = self._entries().order_by(
+            f'{sign}pub_date', f'{sign}post_id'
+        )
+        if position is not None:
+            entries = entries.filter(
+                after((f'{sign}pub_date', f'{sign}post'), position)
+            )
+        keys = set(entries.values_list('pub_date', 'post_id')[:limit])
+        if self.authors:
+            pulled = self._pulled().order_by(f'{sign}pub_date', f'{sign}id')
+            if position is not None:
+                pulled = pulled.filter(after(ordering, position))
+            keys |= set(pulled.values_list('pub_date', 'id')[:limit])
+        keys = sorted(keys, reverse=descending)[:limit]
+        if not keys:
+            return []
+        posts = {
+            item['id'] if isinstance(item, dict) else item.pk: item
+            for item in self.queryset.filter(
+                pk__in=[pk for _, pk in keys]
+            ).order_by()
+        }
+        return [posts[pk] for _, pk in keys if pk in posts]
+
+
+def get_follow_feed(user):
+    return FollowFeed(user)
+
+
+def _push(entries):
+    # Пачки режем сами: в Django 2.2 явный batch_size не ограничивается
+    # пределом SQLite на число строк в одном INSERT.
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, FANOUT_BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    if not is_fanout_author(post.author_id):
+        return
+    _push(
+        TimelineEntry(user_id=user_id, post_id=post.pk,
+                      pub_date=post.pub_date)
+        for user_id in Follow.objects.filter(
+            author_id=post.author_id
+        ).values_list('user_id', flat=True).iterator()
+    )
+
+
+def add_author(user_id, author_id):
+    if not is_fanout_author(author_id):
+        return
+    _push(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in Post.objects.filter(
+            author_id=author_id
+        ).values_list('pk', 'pub_date').iterator()
+    )
+
+
+def remove_author(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id
+    ).delete()
+
+
+def _insert_from_follows(condition='', params=()):
+    """INSERT ... SELECT строк лент по подпискам на авторов, чьи посты
+    рассылаются при записи (см. is_fanout_author), с доп. условием на
+    follow."""
+    connection = connections[router.db_for_write(TimelineEntry)]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(TimelineEntry._meta.db_table)} '
+            f'({quote("user_id")}, {quote("post_id")}, {quote("pub_date")}) '
+            f'SELECT follow.{quote("user_id")}, post.{quote("id")}, '
+            f'post.{quote("pub_date")} '
+            f'FROM {quote(Follow._meta.db_table)} follow '
+            f'INNER JOIN {quote(Post._meta.db_table)} post '
+            f'ON post.{quote("author_id")} = follow.{quote("author_id")} '
+            f'LEFT OUTER JOIN {quote(Profile._meta.db_table)} profile '
+            f'ON profile.{quote("user_id")} = follow.{quote("author_id")} '
+            f'WHERE COALESCE(profile.{quote("followers_count")}, 0) <= %s'
+            + (f' AND follow.{quote("author_id")} {condition}'
+               if condition else ''),
+            [FANOUT_FOLLOWERS_LIMIT, *params]
+        )
+
+
+def backfill_authors(author_ids):
+    """Вызывается после уменьшения счётчиков подписчиков. Авторы, у
+    которых подписчиков стало ровно FANOUT_FOLLOWERS_LIMIT, снова
+    рассылаются при записи, а pull_authors их больше не дочитывает:
+    все их посты заново раскладываются по лентам подписчиков, иначе
+    пропали бы написанные, пока автор был популярным."""
+    crossed = list(Profile.objects.filter(
+        user_id__in=author_ids,
+        followers_count=FANOUT_FOLLOWERS_LIMIT
+    ).values_list('user_id', flat=True))
+    if not crossed:
+        return
+    TimelineEntry.objects.filter(post__author_id__in=crossed).delete()
+    _insert_from_follows(
+        f'IN ({", ".join(["%s"] * len(crossed))})', crossed
+    )
+
+
+def rebuild_timelines():
+    """Пересобирает ленты одним INSERT ... SELECT по подпискам на авторов,
+    чьи посты рассылаются при записи (см. is_fanout_author); счётчики
+    подписчиков должны быть актуальны."""
+    TimelineEntry.objects.all().delete()
+    _insert_from_follows()
@@ -0,0 +1,212 @@
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from io import BytesIO
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import (TemporaryUploadedFile,
+                                            UploadedFile)
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image, ImageOps
+
+from .models import Post
+from .settings import (IMAGE_UPLOAD_MAX_BYTES, IMAGE_UPLOAD_MAX_PIXELS,
+                       IMAGE_UPLOAD_QUALITY, IMAGE_UPLOAD_WORKERS)
+
+# Режимы в том же цветовом пространстве, что и результат _reencode().
+RGB_MODES = ('RGB', 'RGBA')
+_executor = None
+_lock = threading.Lock()
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Пишет загружаемую картинку во временный файл, на лету считая
+    SHA-256. Как только файл превышает IMAGE_UPLOAD_MAX_BYTES, разбор
+    запроса прерывается без чтения остатка тела, а вместо файла
+    image_upload подставляет заглушку too_large — отказ выдаст форма."""
+
+    def __init__(self, request=None, field_name='image'):
+        super().__init__(request)
+        self.field_name = field_name
+        self.active = False
+        self.too_large = False
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.active = field_name == self.field_name
+        if not self.active:
+            return
+        self.file = TemporaryUploadedFile(
+            self.file_name,
+            self.content_type,
+            0,
+            self.charset,
+            self.content_type_extra
+        )
+        self.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        if start + len(raw_data) > IMAGE_UPLOAD_MAX_BYTES:
+            self.too_large = True
+            self.received = start + len(raw_data)
+            raise StopUpload(connection_reset=True)
+        self.file.write(raw_data)
+        self.sha256.update(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        self.active = False
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.sha256.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if self.active:
+            self.file.close()
+
+    def rejected_file(self):
+        """Заглушка файла, загрузка которого прервана из-за размера."""
+        file = UploadedFile(
+            name=self.file_name,
+            content_type=self.content_type,
+            size=self.received
+        )
+        file.too_large = True
+        return file
+
+
+def image_upload(view):
+    """Подключает ImageUploadHandler к представлению.
+
+    Обработчики загрузки можно менять только до чтения request.POST,
+    а CsrfViewMiddleware читает его раньше представления. Поэтому
+    представление освобождается от проверки в middleware, а CSRF
+    проверяется уже после установки обработчика. Если загрузка прервана
+    из-за размера, в request.FILES кладётся заглушка, чтобы форма
+    отказала, а не сохранила пост без картинки."""
+
+    @wraps(view)
+    def with_rejected_file(request, *args, **kwargs):
+        # request.FILES разбирает тело, если оно ещё не прочитано.
+        files = request.FILES
+        handler = request.upload_handlers[0]
+        if handler.too_large:
+            files.appendlist(
+                handler.field_name, handler.rejected_file()
+            )
+        return view(request, *args, **kwargs)
+
+    protected = csrf_protect(with_rejected_file)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers.insert(0, ImageUploadHandler(request))
+        return protected(request, *args, **kwargs)
+    return wrapper
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=IMAGE_UPLOAD_WORKERS,
+                thread_name_prefix='uploads'
+            )
+        return _executor
+
+
+def _file_sha256(file):
+    sha256 = getattr(file, 'sha256', None)
+    if sha256 is None:
+        sha256 = hashlib.sha256()
+        for chunk in file.chunks():
+            sha256.update(chunk)
+        sha256 = sha256.hexdigest()
+        file.seek(0)
+    return sha256
+
+
+def _output_format(image):
+    if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info:
+        return 'PNG'
+    return 'JPEG'
+
+
+def _reencode(image, image_format):
+    """Декодирует картинку и кодирует заново без метаданных (EXIF,
+    комментарии, текстовые блоки). Цветовой профиль сохраняется, только
+    если картинка уже в RGB: профиль CMYK или оттенков серого в RGB-файле
+    исказил бы цвета, поэтому после convert() такие картинки остаются
+    без профиля, то есть считаются sRGB."""
+    image = ImageOps.exif_transpose(image)
+    icc_profile = (
+        image.info.get('icc_profile') if image.mode in RGB_MODES else None
+    )
+    image = image.convert('RGBA' if image_format == 'PNG' else 'RGB')
+    image.info = {}
+    buffer = BytesIO()
+    options = {'optimize': True}
+    if image_format == 'JPEG':
+        options['quality'] = IMAGE_UPLOAD_QUALITY
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def process_image(file):
+    """Проверяет загруженную картинку и возвращает то, что нужно
+    присвоить полю Post.image.
+
+    Размер в байтах и в пикселях проверяется до декодирования: открытие
+    картинки читает только заголовок. Имя файла — хеш исходного
+    содержимого, поэтому одинаковые картинки хранятся один раз: если
+    такой файл уже есть, возвращается его имя без перекодирования."""
+    if getattr(file, 'too_large', False) or (
+        file.size is not None and file.size > IMAGE_UPLOAD_MAX_BYTES
+    ):
+        raise ValidationError(
+            'Файл больше %(limit)s МБ.',
+            code='file_too_large',
+            params={'limit': IMAGE_UPLOAD_MAX_BYTES // (1024 * 1024)}
+        )
+    sha256 = _file_sha256(file)
+    try:
+        image = Image.open(file)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Загрузите правильное изображение.', code='invalid_image'
+        )
+    width, height = image.size
+    if width * height > IMAGE_UPLOAD_MAX_PIXELS:
+        raise ValidationError(
+            'Изображение больше %(limit)s мегапикселей.',
+            code='image_too_large',
+            params={'limit': IMAGE_UPLOAD_MAX_PIXELS // 1000000}
+        )
+    image_format = _output_format(image)
+    name = Post._meta.get_field('image').generate_filename(
+        None, f'{sha256}.{image_format.lower().replace("jpeg", "jpg")}'
+    )
+    if default_storage.exists(name):
+        return name
+    try:
+        content = _get_executor().submit(
+            _reencode, image, image_format
+        ).result()
+    except (OSError, ValueError, SyntaxError):
+        raise ValidationError(
+            'Загрузите правильное изображение.', code='invalid_image'
+        )
+    return ContentFile(content, name=name.rsplit('/', 1)[-1])
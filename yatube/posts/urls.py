@@ -9,12 +9,24 @@ urlpatterns = [
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
         name='add_comment'),
     path('create/', views.post_create, name='post_create'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/bulk/', views.follow_many, name='follow_many'),
+    path('search/', views.search, name='search'),
+    path(
+        'internal/export/<str:kind>/',
+        views.export_data,
+        name='export_data'
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,60 +1,231 @@
+import json
+
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.template.loader import render_to_string
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import urlencode
+from django.views.decorators.http import require_POST, require_safe
+
+from core.routers import read_replica, use_primary, use_replica
 
+from . import export, feed_cache, follows
+from .conditional import conditional_response, make_etag
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .settings import CACHE_TIME, PAGINATOR_NUM_PAGES
+from .models import Comment, Group, Post, User
+from .paginators import CursorPaginator
+from .search import search_posts
+from .settings import (COMMENTS_MAX_PER_PAGE, COMMENTS_PER_PAGE,
+                       CURSOR_PAGINATION, FEED_CACHE_TIME,
+                       FOLLOW_BULK_MAX_AUTHORS, PAGINATOR_NUM_PAGES)
+from .timeline import get_follow_feed
+from .uploads import image_upload
 
 
-def get_paginator_page(request, items):
+def _get_feed_paginator(request, items, versions):
+    """Пагинатор ленты и позиция страницы после проверки: номер в
+    пределах числа страниц или курсор в каноническом виде."""
+    if CURSOR_PAGINATION or 'cursor' in request.GET:
+        paginator = CursorPaginator(items, PAGINATOR_NUM_PAGES)
+        return paginator, paginator.normalize_cursor(
+            request.GET.get('cursor')
+        )
     paginator = Paginator(items, PAGINATOR_NUM_PAGES)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    paginator.count = feed_cache.get_count(items, versions)
+    try:
+        number = paginator.validate_number(request.GET.get('page'))
+    except PageNotAnInteger:
+        number = 1
+    except EmptyPage:
+        number = paginator.num_pages
+    return paginator, number
+
+
+def _get_cached_page(paginator, position):
+    # Страница попадает в кэш под текущей версией ленты, поэтому
+    # читается с основной базы: реплика может отставать от записи,
+    # сдвинувшей версию, и устаревшая страница жила бы в кэше для всех
+    # до следующего сдвига. Запрос выполняется здесь же, внутри блока.
+    with use_primary():
+        page_obj = paginator.get_page(position)
+        page_obj.object_list = list(page_obj.object_list)
+    return page_obj
+
+
+def get_feed_context(request, items, *feeds):
+    """Страница ленты вычисляется лениво: если фрагмент с постами
+    уже закэширован под текущими версиями лент, запросов к постам нет.
+    Промах кэша читает посты с основной базы (см. _get_cached_page)."""
+    versions = feed_cache.get_versions(feed_cache.ALL_FEEDS, *feeds)
+    paginator, position = _get_feed_paginator(request, items, versions)
+    return {
+        'page_obj': SimpleLazyObject(
+            lambda: _get_cached_page(paginator, position)
+        ),
+        'feed_cache_key': feed_cache.page_key(versions, position),
+        'feed_cache_time': FEED_CACHE_TIME,
+    }
 
 
-@cache_page(CACHE_TIME)
+@read_replica
 def index(request):
-    return render(request, 'posts/index.html', {
-        'page_obj': get_paginator_page(request, Post.objects.all())
-    })
+    context = get_feed_context(
+        request,
+        Post.objects.feed(),
+        feed_cache.INDEX_FEED
+    )
+    return conditional_response(
+        request,
+        lambda: render(request, 'posts/index.html', context),
+        make_etag(request, context['feed_cache_key'])
+    )
 
 
+@read_replica
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    return render(request, 'posts/group_list.html', {
+    context = {
         'group': group,
-        'page_obj': get_paginator_page(request, group.posts.all()),
-        'is_group': True
-    })
+        'is_group': True,
+        **get_feed_context(
+            request,
+            group.posts.feed(),
+            feed_cache.group_feed(group.pk)
+        )
+    }
+    return conditional_response(
+        request,
+        lambda: render(request, 'posts/group_list.html', context),
+        make_etag(
+            request,
+            context['feed_cache_key'],
+            group.title,
+            group.description
+        )
+    )
 
 
+@read_replica
 def profile(request, username):
-    author = User.objects.get(username=username)
+    author = User.objects.select_related('profile').get(username=username)
     is_following = (
         request.user.is_authenticated
         and author != request.user
         and author.following.filter(user=request.user).exists()
     )
-    return render(request, 'posts/profile.html', {
-        'page_obj': get_paginator_page(request, author.posts.all()),
+    context = {
         'author': author,
-        'following': is_following
+        'following': is_following,
+        **get_feed_context(
+            request,
+            author.posts.feed(),
+            feed_cache.profile_feed(author.pk)
+        )
+    }
+    return conditional_response(
+        request,
+        lambda: render(request, 'posts/profile.html', context),
+        make_etag(
+            request,
+            context['feed_cache_key'],
+            is_following,
+            author.get_full_name(),
+            author.profile.posts_count,
+            author.profile.followers_count,
+            author.profile.following_count
+        )
+    )
+
+
+@read_replica
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = Paginator(
+        search_posts(query) if query else [],
+        PAGINATOR_NUM_PAGES
+    ).get_page(request.GET.get('page'))
+    posts = Post.objects.feed().in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        posts[pk] for pk in page_obj.object_list if pk in posts
+    ]
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': page_obj,
+        'paginator_query': urlencode({'q': query}) + '&'
     })
 
 
+@read_replica
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'),
+        pk=post_id
+    )
     form = CommentForm(request.POST or None)
-    return render(request, 'posts/post_detail.html', {
-        'post': post,
-        'form': form,
-        'is_post_detail': True
+    # Версия профиля автора сдвигается при любом изменении его постов
+    # и при готовности вариантов картинки.
+    versions = feed_cache.get_versions(
+        feed_cache.ALL_FEEDS, feed_cache.profile_feed(post.author_id)
+    )
+    return conditional_response(
+        request,
+        lambda: render(request, 'posts/post_detail.html', {
+            'post': post,
+            'form': form,
+            'comments': get_comments_page(
+                post.pk, request.GET.get('comments')
+            ),
+            'is_post_detail': True
+        }),
+        make_etag(
+            request,
+            *versions,
+            post.pk,
+            post.updated_at.isoformat(),
+            post.comments_count,
+            post.group.title if post.group else ''
+        )
+    )
+
+
+def get_comments_page(post_id, cursor=None, limit=COMMENTS_PER_PAGE):
+    """Страница комментариев поста по курсору, от старых к новым."""
+    return CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related(
+            'author'
+        ).only('text', 'created', 'post_id', 'author__username'),
+        min(limit, COMMENTS_MAX_PER_PAGE),
+        ordering=('created', 'id')
+    ).get_page(cursor)
+
+
+@read_replica
+def post_comments(request, post_id):
+    """Следующая порция комментариев для подгрузки на странице поста:
+    готовый HTML и курсор продолжения."""
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    try:
+        limit = int(request.GET.get('limit', COMMENTS_PER_PAGE))
+    except ValueError:
+        limit = COMMENTS_PER_PAGE
+    page = get_comments_page(
+        post_id, request.GET.get('cursor'), max(limit, 1)
+    )
+    return JsonResponse({
+        'html': render_to_string(
+            'posts/includes/comments.html', {'comments': page}, request
+        ),
+        'next_cursor': page.next_cursor,
     })
 
 
 @login_required
+@image_upload
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if not form.is_valid():
@@ -65,6 +236,7 @@ def post_create(request):
     return redirect('posts:profile', username=request.user)
 
 
+@image_upload
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     if post.author != request.user:
@@ -84,6 +256,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -96,31 +269,77 @@ def add_comment(request, post_id):
 
 
 @login_required
+@read_replica
 def follow_index(request):
-    return render(request, 'posts/follow.html', {
-        'page_obj': get_paginator_page(
-            request,
-            Post.objects.filter(author__following__user=request.user)
-        )
-    })
+    posts = get_follow_feed(request.user)
+    return render(request, 'posts/follow.html', get_feed_context(
+        request,
+        posts.feed(),
+        *feed_cache.get_follow_feeds(request.user, posts.authors)
+    ))
 
 
 @login_required
 def profile_follow(request, username):
-    author = User.objects.get(username=username)
-    if not (author == request.user
-            or author.following.filter(user=request.user).exists()):
-        Follow.objects.create(
-            user=request.user,
-            author=author
-        )
+    follows.follow(request.user, [username])
     return redirect('posts:profile', username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    get_object_or_404(
-        Follow, user=request.user,
-        author__username=username
-    ).delete()
+    follows.unfollow(request.user, [username])
     return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+def follow_many(request):
+    """Подписка на список авторов одним запросом (для онбординга).
+    Принимает JSON {"authors": ["username", ...]}."""
+    try:
+        authors = json.loads(request.body)['authors']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse(
+            {'error': 'Ожидается JSON вида {"authors": [...]}'}, status=400
+        )
+    if (not isinstance(authors, list)
+            or not all(isinstance(author, str) for author in authors)):
+        return JsonResponse(
+            {'error': 'authors должен быть списком имён'}, status=400
+        )
+    if len(authors) > FOLLOW_BULK_MAX_AUTHORS:
+        return JsonResponse(
+            {'error': f'Не больше {FOLLOW_BULK_MAX_AUTHORS} авторов'},
+            status=400
+        )
+    followed = follows.follow(request.user, authors)
+    return JsonResponse({'followed': list(User.objects.filter(
+        pk__in=followed
+    ).values_list('username', flat=True))})
+
+
+def _from_replica(chunks):
+    # Генератор выполняется уже после выхода из представления, поэтому
+    # чтения на реплику переключаются здесь, а не декоратором.
+    with use_replica():
+        yield from chunks
+
+
+@staff_member_required
+@require_safe
+def export_data(request, kind):
+    """Потоковая выгрузка posts, comments или follows для персонала:
+    ?format=ndjson|csv, ?gzip=1 — сжатие на лету."""
+    export_format = request.GET.get('format', 'ndjson')
+    if kind not in export.EXPORTS or export_format not in export.FORMATS:
+        raise Http404
+    gzip = request.GET.get('gzip') == '1'
+    response = StreamingHttpResponse(
+        _from_replica(export.stream(kind, export_format, gzip)),
+        content_type='application/gzip' if gzip
+        else f'{export.FORMATS[export_format][0]}; charset=utf-8'
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{export.filename(kind, export_format, gzip)}"'
+    )
+    return response
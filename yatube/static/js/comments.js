@@ -0,0 +1,22 @@
+(function () {
+  var more = document.getElementById('comments-more');
+  var list = document.getElementById('comments');
+  if (!more || !list) {
+    return;
+  }
+  more.addEventListener('click', function (event) {
+    event.preventDefault();
+    var url = more.dataset.url + '?cursor=' + encodeURIComponent(more.dataset.cursor);
+    fetch(url, {credentials: 'same-origin'})
+      .then(function (response) { return response.json(); })
+      .then(function (data) {
+        list.insertAdjacentHTML('beforeend', data.html);
+        if (data.next_cursor) {
+          more.dataset.cursor = data.next_cursor;
+          more.href = '?comments=' + data.next_cursor;
+        } else {
+          more.remove();
+        }
+      });
+  });
+})();
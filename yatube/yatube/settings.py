@@ -38,11 +38,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaStickyMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -52,7 +54,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.InstrumentedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -67,6 +69,10 @@ TEMPLATES = [
     },
 ]
 
+# Шаблоны, которые компилируются при запуске процесса, а не первым
+# запросом (имеет смысл с кэширующим загрузчиком, см. settings_prod).
+TEMPLATE_WARMUP = ()
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -80,6 +86,24 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения. Локально реплику можно изобразить копией
+# базы: sqlite3 db.sqlite3 ".backup replica.sqlite3" и
+# YATUBE_REPLICA_DB=replica.sqlite3. Копия не обновляется сама, поэтому
+# хорошо видно, какие чтения идут на реплику.
+REPLICA_DATABASES = []
+if os.environ.get('YATUBE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['YATUBE_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append('replica')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Сколько секунд после записи пользователь читает с основной базы.
+REPLICA_STICKY_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -121,6 +145,7 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = (
     os.path.join(BASE_DIR, 'static'),
 )
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -131,11 +156,43 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Запросы дольше этого числа секунд пишутся в лог с самыми долгими
+# SQL-запросами; метрики отдаются только с адресов METRICS_ALLOWED_IPS.
+METRICS_SLOW_REQUEST_SECONDS = 1.0
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CACHES = {
     'default': {
+        'BACKEND': 'core.cache.TwoTierCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_TIMEOUT': 5,
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_BYPASS_PREFIXES': ('feed-version:',),
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.FileCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'TIMEOUT': 60 * 60 * 6,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'CULL_EVERY': 1000,
+        },
+    },
+    # Подменяет default на время команды benchmark: замеры не читают и
+    # не очищают кэш сайта.
+    'benchmark': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'LOCATION': 'benchmark',
+    },
 }
+# Локальный уровень default обновляется только в своём процессе:
+# изменяемые значения под постоянными ключами другие воркеры увидят
+# с задержкой до LOCAL_TIMEOUT (см. core.cache.TwoTierCache).
+
+# Тесты пишут файловый кэш во временный каталог, а не в BASE_DIR/cache.
+TEST_RUNNER = 'core.test_runner.TemporaryCacheRunner'
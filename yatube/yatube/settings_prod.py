@@ -0,0 +1,92 @@
+"""Настройки для продакшена: DJANGO_SETTINGS_MODULE=yatube.settings_prod.
+
+База выбирается переменной YATUBE_DB: sqlite (по умолчанию) или
+postgresql.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES, MIDDLEWARE, TEMPLATES
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+DEBUG = False
+
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost').split()
+
+# Соединение с базой живёт между запросами одного воркера.
+CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+
+if os.environ.get('YATUBE_DB', 'sqlite') == 'postgresql':
+    # Пул соединений держит PgBouncer в режиме transaction: серверные
+    # курсоры в нём не работают, поэтому они отключены.
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('POSTGRES_DB', 'yatube'),
+        'USER': os.environ.get('POSTGRES_USER', 'yatube'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '6432'),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'DISABLE_SERVER_SIDE_CURSORS': True,
+        'OPTIONS': {
+            'connect_timeout': 5,
+        },
+    }
+    DATABASES.pop('replica', None)
+    REPLICA_DATABASES = []
+    if os.environ.get('DB_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.environ['DB_REPLICA_HOST'],
+            'TEST': {'MIRROR': 'default'},
+        }
+        REPLICA_DATABASES.append('replica')
+else:
+    DATABASES['default']['NAME'] = os.environ.get(
+        'SQLITE_PATH', os.path.join(BASE_DIR, 'db.sqlite3')
+    )
+    for database in DATABASES.values():
+        database['ENGINE'] = 'core.db.backends.sqlite3'
+        database['CONN_MAX_AGE'] = CONN_MAX_AGE
+
+# Статика: collectstatic кладёт в STATIC_ROOT файлы с хэшем содержимого
+# в имени и их сжатые копии (.gz, .br при установленном brotli). nginx
+# отдаёт их с gzip_static/brotli_static и expires max для имён с хэшем.
+# На одной машине без nginx статику отдаёт сам Django:
+# YATUBE_SERVE_STATIC=1.
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+STATIC_ROOT = os.environ.get(
+    'STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles')
+)
+if os.environ.get('YATUBE_SERVE_STATIC') == '1':
+    MIDDLEWARE = list(MIDDLEWARE)
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+        'core.middleware.StaticFilesMiddleware'
+    )
+
+# Шаблоны компилируются один раз на процесс, {% include %} с постоянным
+# именем подставляется при компиляции (core.template_loaders). Главные
+# страницы компилируются при запуске, до первого запроса.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [(
+            'core.template_loaders.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]
+        )],
+    },
+}]
+TEMPLATE_WARMUP = (
+    'posts/index.html',
+    'posts/group_list.html',
+    'posts/profile.html',
+    'posts/follow.html',
+    'posts/post_detail.html',
+    'posts/search.html',
+)